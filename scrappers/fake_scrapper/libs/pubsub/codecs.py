@@ -0,0 +1,100 @@
+"""Stock message codecs
+
+The first byte of a message identifies its codec, so subscribers decode
+whatever codec the publisher was configured with:
+    b'{'    - orjson, plain json documents are their own header,
+              messages of publishers predating codecs decode unchanged
+    b'\\x01' - msgpack array [ticker, price, timestamp]
+    b'\\x02' - struct, little-endian int64 price, int64 timestamp,
+              then utf-8 ticker
+b'\\x00' is taken by tick frames (see frames.py), b'\\x03' by sequence
+envelopes (see sequence.py).
+"""
+import struct
+
+import msgpack
+import orjson
+
+
+class ICodec:
+    name: str
+    header: bytes
+
+    def encode(self, stock: dict) -> bytes:
+        ...
+
+    def decode(self, data: bytes) -> dict:
+        ...
+
+
+class OrjsonCodec(ICodec):
+    name = 'json'
+    header = b'{'
+
+    def encode(self, stock: dict) -> bytes:
+        return orjson.dumps(stock)
+
+    def decode(self, data: bytes) -> dict:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(ICodec):
+    name = 'msgpack'
+    header = b'\x01'
+
+    def encode(self, stock: dict) -> bytes:
+        return self.header + msgpack.packb(
+            (stock['ticker'], stock['price'], stock['timestamp'])
+        )
+
+    def decode(self, data: bytes) -> dict:
+        ticker, price, timestamp = msgpack.unpackb(memoryview(data)[1:])
+        return {
+            'ticker': ticker,
+            'price': price,
+            'timestamp': timestamp
+        }
+
+
+class StructCodec(ICodec):
+    name = 'struct'
+    header = b'\x02'
+    layout = struct.Struct('<cqq')
+
+    def encode(self, stock: dict) -> bytes:
+        return self.layout.pack(
+            self.header,
+            stock['price'],
+            stock['timestamp']
+        ) + stock['ticker'].encode()
+
+    def decode(self, data: bytes) -> dict:
+        _, price, timestamp = self.layout.unpack_from(data)
+        return {
+            'ticker': data[self.layout.size:].decode(),
+            'price': price,
+            'timestamp': timestamp
+        }
+
+
+CODECS: dict[str, ICodec] = {
+    codec.name: codec
+    for codec in (OrjsonCodec(), MsgpackCodec(), StructCodec())
+}
+CODECS_BY_HEADER: dict[bytes, ICodec] = {
+    codec.header: codec for codec in CODECS.values()
+}
+
+
+def get_codec(name: str) -> ICodec:
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f'Unknown codec {name}, available: {", ".join(CODECS)}')
+    return codec
+
+
+def decode_stock(data: bytes) -> dict:
+    codec = CODECS_BY_HEADER.get(data[:1])
+    if codec is None:
+        raise ValueError(f'Unknown codec header {data[:1]!r}')
+    return codec.decode(data)
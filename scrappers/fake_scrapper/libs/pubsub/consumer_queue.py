@@ -0,0 +1,150 @@
+"""Bounded buffer between a subscription and one consumer
+
+A consumer slower than the stream fills its own queue instead of
+stalling the subscription, what happens once the queue is full
+depends on the policy:
+    block       - the producer waits for room (lossless, a stalled
+                  consumer stalls the subscription as before)
+    drop_oldest - the oldest items are dropped to make room
+    conflate    - an item replaces the pending one with the same
+                  `key` (the latest price per ticker), nothing is
+                  dropped, the queue is bounded by the number of keys
+                  rather than `maxsize`
+"""
+from asyncio import Event, TimeoutError, wait_for
+from collections import deque
+from time import monotonic, perf_counter
+from typing import Any, Callable, Hashable
+
+QUEUE_POLICIES = ('block', 'drop_oldest', 'conflate')
+QUEUE_MAXSIZE = 1000
+
+
+class ConsumerQueue:
+    def __init__(
+        self,
+        maxsize: int = QUEUE_MAXSIZE,
+        policy: str = 'drop_oldest',
+        key: Callable[[Any], Hashable] = None
+    ) -> None:
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(
+                f'Unknown queue policy {policy}, available: {", ".join(QUEUE_POLICIES)}'
+            )
+        if policy == 'conflate' and key is None:
+            raise ValueError('conflate policy needs a key')
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        if policy == 'conflate':
+            self.pending: dict[Hashable, Any] = {}
+        else:
+            maxlen = maxsize if policy == 'drop_oldest' else None
+            self.items: deque = deque(maxlen=maxlen)
+        self.not_empty = Event()
+        self.not_full = Event()
+        self.not_full.set()
+        # set when the producer failed, raised to the consumer
+        # once the queue is drained
+        self.error: BaseException = None
+        self.put_items = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.blocked_sec = 0.0
+        self.peak = 0
+
+    def __len__(self) -> int:
+        if self.policy == 'conflate':
+            return len(self.pending)
+        return len(self.items)
+
+    async def put(self, item):
+        await self.put_many([item])
+
+    async def put_many(self, items: list):
+        """With `block` the room is checked before adding,
+        the queue may exceed `maxsize` by len(items) - 1"""
+        if self.policy == 'block':
+            if len(self.items) >= self.maxsize:
+                start = perf_counter()
+                while len(self.items) >= self.maxsize:
+                    self.not_full.clear()
+                    await self.not_full.wait()
+                self.blocked_sec += perf_counter() - start
+            self.items.extend(items)
+        elif self.policy == 'drop_oldest':
+            before = len(self.items)
+            self.items.extend(items)
+            self.dropped += before + len(items) - len(self.items)
+        else:
+            self.conflate(items)
+        self.put_items += len(items)
+        size = len(self)
+        if size > self.peak:
+            self.peak = size
+        if size:
+            self.not_empty.set()
+
+    def conflate(self, items: list):
+        pending = self.pending
+        key = self.key
+        for item in items:
+            k = key(item)
+            if k in pending:
+                self.conflated += 1
+            pending[k] = item
+
+    def fail(self, error: BaseException):
+        self.error = error
+        self.not_empty.set()
+
+    def pop(self):
+        if self.policy == 'conflate':
+            return self.pending.pop(next(iter(self.pending)))
+        return self.items.popleft()
+
+    async def wait(self):
+        while not len(self):
+            if self.error is not None:
+                raise self.error
+            self.not_empty.clear()
+            await self.not_empty.wait()
+
+    async def get(self):
+        await self.wait()
+        item = self.pop()
+        self.not_full.set()
+        return item
+
+    async def get_batch(self, max_items: int, max_wait: float = 0.0) -> list:
+        """Up to `max_items` items, waits for the first one and at most
+        `max_wait` seconds more for the batch to fill"""
+        await self.wait()
+        batch = []
+        deadline = monotonic() + max_wait
+        while len(batch) < max_items:
+            if len(self):
+                batch.append(self.pop())
+                continue
+            timeout = deadline - monotonic()
+            if timeout <= 0 or self.error is not None:
+                break
+            self.not_full.set()
+            try:
+                await wait_for(self.wait(), timeout)
+            except TimeoutError:
+                break
+        self.not_full.set()
+        return batch
+
+    def stats(self) -> dict:
+        return {
+            'policy': self.policy,
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'peak': self.peak,
+            'put': self.put_items,
+            'dropped': self.dropped,
+            'conflated': self.conflated,
+            'blocked_sec': self.blocked_sec,
+        }
@@ -0,0 +1,81 @@
+"""Tick frame: all stocks of one tick in a single columnar binary message
+
+Layout (little-endian):
+    header  - marker byte 0x00, version byte, int64 timestamp, uint32 count
+    prices  - count * int64
+    tickers - utf-8 ticker names separated by b'\\n'
+
+The marker byte is not a header of any stock codec (see codecs.py),
+so subscribers can tell frames from per-stock messages on the same
+channel.
+"""
+import struct
+from typing import NamedTuple
+
+from .codecs import decode_stock
+from .sequence import split_sequence
+
+FRAME_MARKER = b'\x00'
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<cBqI')
+TICKERS_SEPARATOR = b'\n'
+
+
+class TickFrame(NamedTuple):
+    timestamp: int
+    tickers: list[str]
+    prices: tuple[int, ...]
+
+
+def encode_tickers(tickers: list[str]) -> bytes:
+    return TICKERS_SEPARATOR.join(t.encode() for t in tickers)
+
+
+def encode_tick_frame(
+    timestamp: int,
+    tickers: list[str],
+    prices: list[int],
+    tickers_block: bytes = None
+) -> bytes:
+    """`tickers_block` is `encode_tickers(tickers)`, pass it to reuse
+    the encoded names between ticks"""
+    count = len(prices)
+    if tickers_block is None:
+        tickers_block = encode_tickers(tickers)
+    return b''.join((
+        FRAME_HEADER.pack(FRAME_MARKER, FRAME_VERSION, timestamp, count),
+        struct.pack(f'<{count}q', *prices),
+        tickers_block
+    ))
+
+
+def is_tick_frame(data: bytes) -> bool:
+    return data[:1] == FRAME_MARKER
+
+
+def decode_tick_frame(data: bytes) -> TickFrame:
+    marker, version, timestamp, count = FRAME_HEADER.unpack_from(data)
+    if version != FRAME_VERSION:
+        raise ValueError(f'Unsupported tick frame version {version}')
+    offset = FRAME_HEADER.size
+    prices = struct.unpack_from(f'<{count}q', data, offset)
+    offset += count * 8
+    tickers = data[offset:].decode().split('\n') if count else []
+    return TickFrame(timestamp, tickers, prices)
+
+
+def decode_stocks(data: bytes) -> list[dict]:
+    """Decodes either a tick frame or a single stock message,
+    a sequence envelope is stripped"""
+    _, _, data = split_sequence(data)
+    if not is_tick_frame(data):
+        return [decode_stock(data)]
+    timestamp, tickers, prices = decode_tick_frame(data)
+    return [
+        {
+            'ticker': ticker,
+            'price': price,
+            'timestamp': timestamp
+        }
+        for ticker, price in zip(tickers, prices)
+    ]
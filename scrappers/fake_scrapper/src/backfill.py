@@ -0,0 +1,204 @@
+"""Offline synthetic history backfill
+
+Generates the price walk for a ticker set and time range without waiting
+for real time ticks and streams it into the TimescaleDB prices
+hypertable with binary COPY, optionally into RedisTimeSeries with
+chunked TS.MADD. Series retention trims samples older than
+`redis_timeseries_retention_period_sec` before the newest one, so only
+the last retention period of the range is written to RedisTimeSeries.
+
+Usage:
+    python src/backfill.py --start 2022-01-01T00:00:00 [--end ...]
+        [--interval-sec 1] [--tickers-cnt 100] [--model random_walk]
+        [--initial-price 100] [--chunk-ticks 1000] [--redis]
+"""
+import logging
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import repeat
+from time import perf_counter
+
+import asyncpg
+import numpy as np
+from asyncpg.connection import Connection
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from settings import settings, gen_tickers
+from price_models import PRICE_MODELS, IPriceModel, create_price_model
+from libs.redis_async_timeseries import TimeSeries
+
+LOG = logging.getLogger(settings.log_name)
+
+PRICES_TABLE = settings.timescaledb_prices_table
+TICKERS_TABLE = settings.timescaledb_tickers_table
+PRICES_COLUMNS = ['ts', 'price', 'ticker']
+RETENTION_PERIOD_MS = settings.redis_timeseries_retention_period_sec * 1000
+
+
+def chunk_timestamps(start: datetime, interval: timedelta, cnt: int) -> list[datetime]:
+    return [start + interval * i for i in range(cnt)]
+
+
+def chunk_records(
+    timestamps: list[datetime],
+    tickers: list[str],
+    prices: np.ndarray
+):
+    for ts, row in zip(timestamps, prices.tolist()):
+        yield from zip(repeat(ts), row, tickers)
+
+
+async def copy_to_timescaledb(
+    conn: Connection,
+    timestamps: list[datetime],
+    tickers: list[str],
+    prices: np.ndarray
+):
+    await conn.copy_records_to_table(
+        PRICES_TABLE,
+        records=chunk_records(timestamps, tickers, prices),
+        columns=PRICES_COLUMNS
+    )
+
+
+async def init_redis_ts(timeseries: TimeSeries, tickers: list[str]):
+    # TS.MADD does not create series, labels match the ones set by fillers
+    for t in tickers:
+        try:
+            await timeseries.create(
+                t,
+                retention_msecs=RETENTION_PERIOD_MS,
+                duplicate_policy='last',
+                labels={'channel': settings.pubsub_channel, 'ticker': t}
+            )
+        except ResponseError as e:
+            if 'key already exists' not in str(e):
+                raise e
+
+
+async def madd_to_redis_ts(
+    timeseries: TimeSeries,
+    timestamps: list[datetime],
+    tickers: list[str],
+    prices: np.ndarray,
+    chunk_size: int
+):
+    samples = []
+    for ts, row in zip(timestamps, prices.tolist()):
+        ts_ms = int(ts.timestamp() * 1000)
+        samples.extend(zip(tickers, repeat(ts_ms), row))
+    for i in range(0, len(samples), chunk_size):
+        await timeseries.madd(samples[i:i + chunk_size])
+
+
+async def backfill(
+    tickers: list[str],
+    model: IPriceModel,
+    start: datetime,
+    end: datetime,
+    interval: timedelta,
+    initial_price: int,
+    chunk_ticks: int,
+    timeseries: TimeSeries = None,
+    redis_chunk_size: int = 10_000
+):
+    conn: Connection = await asyncpg.connect(
+        host=settings.timescaledb_timeseries_host,
+        port=settings.timescaledb_timeseries_port,
+        user=settings.timescaledb_timeseries_user,
+        password=settings.timescaledb_timeseries_pass,
+        database=settings.timescaledb_timeseries_db,
+    )
+    try:
+        await conn.executemany(
+            f"""
+            INSERT INTO {TICKERS_TABLE} (ticker)
+            VALUES ($1) ON CONFLICT DO NOTHING;
+            """,
+            [(t,) for t in tickers]
+        )
+        if timeseries is not None:
+            await init_redis_ts(timeseries, tickers)
+        ticks_total = int((end - start) / interval) + 1
+        redis_start = end - timedelta(milliseconds=RETENTION_PERIOD_MS)
+        if timeseries is not None and redis_start > start:
+            LOG.info(
+                f'RedisTimeseries retention keeps samples since {redis_start}, '
+                'older ticks are written to TimescaleDB only'
+            )
+        prices = np.full(len(tickers), initial_price, dtype=np.int64)
+        started = perf_counter()
+        done = 0
+        while done < ticks_total:
+            cnt = min(chunk_ticks, ticks_total - done)
+            timestamps = chunk_timestamps(start + interval * done, interval, cnt)
+            chunk = model.steps(prices, cnt)
+            await copy_to_timescaledb(conn, timestamps, tickers, chunk)
+            first = bisect_left(timestamps, redis_start)
+            if timeseries is not None and first < cnt:
+                await madd_to_redis_ts(
+                    timeseries,
+                    timestamps[first:],
+                    tickers,
+                    chunk[first:],
+                    redis_chunk_size
+                )
+            done += cnt
+            rows = done * len(tickers)
+            rate = rows / (perf_counter() - started) * 60
+            LOG.info(
+                f'Backfilled {done}/{ticks_total} ticks, '
+                f'{rows} rows ({rate:,.0f} rows/min)'
+            )
+    finally:
+        await conn.close()
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(description='Synthetic prices history backfill')
+    parser.add_argument('--start', type=datetime.fromisoformat, required=True)
+    parser.add_argument('--end', type=datetime.fromisoformat, default=None)
+    parser.add_argument('--interval-sec', type=float, default=settings.scrap_interval_sec)
+    parser.add_argument(
+        '--tickers-cnt',
+        type=int,
+        default=None,
+        help='generated tickers count, settings tickers by default'
+    )
+    parser.add_argument('--model', choices=list(PRICE_MODELS), default=settings.price_model)
+    parser.add_argument('--initial-price', type=int, default=100)
+    parser.add_argument('--chunk-ticks', type=int, default=1000)
+    parser.add_argument('--redis', action='store_true', help='also fill RedisTimeSeries')
+    parser.add_argument('--redis-chunk-size', type=int, default=10_000)
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    tickers = gen_tickers(args.tickers_cnt) if args.tickers_cnt else settings.tickers
+    end = args.end if args.end else datetime.now()
+    timeseries = None
+    if args.redis:
+        timeseries = TimeSeries(Redis(
+            host=settings.redis_timeseries_host,
+            port=settings.redis_timeseries_port,
+        ))
+    LOG.info(f'Backfilling {len(tickers)} tickers from {args.start} to {end}')
+    await backfill(
+        tickers,
+        create_price_model(args.model),
+        args.start,
+        end,
+        timedelta(seconds=args.interval_sec),
+        args.initial_price,
+        args.chunk_ticks,
+        timeseries,
+        args.redis_chunk_size
+    )
+
+
+if __name__ == '__main__':
+    run(main())
@@ -0,0 +1,89 @@
+"""Encode/decode cost and bytes on the wire per quote of the stock codecs,
+tick frames are measured per quote of a frame of `--tickers-cnt` quotes
+
+Usage: python src/bench_codecs.py [--tickers-cnt 1000] [--rounds 20]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from settings import gen_tickers
+from libs.pubsub.codecs import CODECS, decode_stock
+from libs.pubsub.frames import decode_stocks, encode_tick_frame
+
+TIMESTAMP_MS = 1_640_995_200_000
+
+
+def gen_stocks(cnt: int) -> list[dict]:
+    return [
+        {
+            'ticker': ticker,
+            'price': 100 + i,
+            'timestamp': TIMESTAMP_MS
+        }
+        for i, ticker in enumerate(gen_tickers(cnt))
+    ]
+
+
+def best_of(rounds: int, fn) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = perf_counter()
+        fn()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def bench_codec(codec, stocks: list[dict], rounds: int) -> dict:
+    encode = codec.encode
+    messages = [encode(s) for s in stocks]
+    assert [decode_stock(m) for m in messages] == stocks
+    encode_sec = best_of(rounds, lambda: [encode(s) for s in stocks])
+    decode_sec = best_of(rounds, lambda: [decode_stock(m) for m in messages])
+    return {
+        'encode_ns': encode_sec / len(stocks) * 1e9,
+        'decode_ns': decode_sec / len(stocks) * 1e9,
+        'bytes': sum(map(len, messages)) / len(stocks),
+    }
+
+
+def bench_frame(stocks: list[dict], rounds: int) -> dict:
+    def encode():
+        return encode_tick_frame(
+            TIMESTAMP_MS,
+            [s['ticker'] for s in stocks],
+            [s['price'] for s in stocks]
+        )
+
+    frame = encode()
+    assert decode_stocks(frame) == stocks
+    encode_sec = best_of(rounds, encode)
+    decode_sec = best_of(rounds, lambda: decode_stocks(frame))
+    return {
+        'encode_ns': encode_sec / len(stocks) * 1e9,
+        'decode_ns': decode_sec / len(stocks) * 1e9,
+        'bytes': len(frame) / len(stocks),
+    }
+
+
+def main():
+    parser = ArgumentParser(description='Stock codecs microbenchmark')
+    parser.add_argument('--tickers-cnt', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    stocks = gen_stocks(args.tickers_cnt)
+    print(f'{"codec":<10}{"encode ns":>12}{"decode ns":>12}{"bytes":>8}')
+    results = {
+        name: bench_codec(codec, stocks, args.rounds)
+        for name, codec in CODECS.items()
+    }
+    results['frame'] = bench_frame(stocks, args.rounds)
+    for name, r in results.items():
+        print(
+            f'{name:<10}{r["encode_ns"]:>12.0f}'
+            f'{r["decode_ns"]:>12.0f}{r["bytes"]:>8.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
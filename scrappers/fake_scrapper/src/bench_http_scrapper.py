@@ -0,0 +1,73 @@
+"""HttpQuoteScrapper throughput against a slow local stub quote server
+
+Usage: python src/bench_http_scrapper.py [--tickers-cnt 1000]
+    [--latency-ms 50] [--ticks 10] [--concurrency 8 64 256]
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from time import perf_counter
+
+from aiohttp import web
+
+from settings import gen_tickers
+from http_scrapper import HttpQuoteScrapper
+from stub_quote_server import create_app
+
+HOST = '127.0.0.1'
+PORT = 8091
+
+
+async def bench(tickers: list[str], ticks: int, concurrency: int) -> dict:
+    scrapper = HttpQuoteScrapper(
+        'bench',
+        f'http://{HOST}:{PORT}/quote/{{ticker}}',
+        concurrency=concurrency,
+        pool_size=concurrency
+    )
+    await scrapper.start()
+    quotes = 0
+    start = perf_counter()
+    try:
+        for _ in range(ticks):
+            await scrapper.fetch(tickers)
+            quotes += len(scrapper.get_stocks_status(tickers))
+    finally:
+        await scrapper.close()
+    elapsed = perf_counter() - start
+    return {
+        'quotes': quotes,
+        'errors': scrapper.errors,
+        'tick_ms': elapsed / ticks * 1000,
+        'quotes_per_sec': quotes / elapsed,
+    }
+
+
+async def main():
+    parser = ArgumentParser(description='HTTP scrapper source benchmark')
+    parser.add_argument('--tickers-cnt', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--ticks', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 64, 256])
+    args = parser.parse_args()
+
+    runner = web.AppRunner(create_app(args.latency_ms), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    tickers = gen_tickers(args.tickers_cnt)
+    print(
+        f'{args.tickers_cnt} tickers, {args.latency_ms}ms source latency\n'
+        f'{"concurrency":>12}{"tick ms":>12}{"quotes/s":>12}{"errors":>8}'
+    )
+    try:
+        for concurrency in args.concurrency:
+            r = await bench(tickers, args.ticks, concurrency)
+            print(
+                f'{concurrency:>12}{r["tick_ms"]:>12.1f}'
+                f'{r["quotes_per_sec"]:>12.0f}{r["errors"]:>8}'
+            )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    run(main())
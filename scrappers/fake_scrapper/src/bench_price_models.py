@@ -0,0 +1,48 @@
+"""Compares scalar `generate_new_price` loop with vectorized price models
+
+Usage: python src/bench_price_models.py [tickers_cnt ...]
+"""
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from price_models import PRICE_MODELS, generate_new_price
+
+TICKS = 20
+DEFAULT_SIZES = [100, 10_000, 100_000]
+
+
+def bench_scalar(prices: list[int]) -> float:
+    start = perf_counter()
+    for _ in range(TICKS):
+        prices = [generate_new_price(p) for p in prices]
+    return (perf_counter() - start) / TICKS
+
+
+def bench_vectorized(model_name: str, prices: np.ndarray) -> float:
+    model = PRICE_MODELS[model_name]()
+    start = perf_counter()
+    for _ in range(TICKS):
+        prices = model.step(prices)
+    return (perf_counter() - start) / TICKS
+
+
+def main(sizes: list[int]):
+    print(f'{"model":<16}{"tickers":>10}{"ms/tick":>12}{"speedup":>10}')
+    for size in sizes:
+        initial = np.full(size, 100, dtype=np.int64)
+        scalar = bench_scalar(initial.tolist())
+        print(f'{"scalar":<16}{size:>10}{scalar * 1000:>12.3f}{1:>10.1f}')
+        for name in PRICE_MODELS:
+            vectorized = bench_vectorized(name, initial.copy())
+            speedup = scalar / vectorized
+            print(
+                f'{name:<16}{size:>10}'
+                f'{vectorized * 1000:>12.3f}{speedup:>10.1f}'
+            )
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or DEFAULT_SIZES
+    main(sizes)
@@ -0,0 +1,199 @@
+"""libs/pubsub throughput and latency sweep
+
+Every round publishes one message per ticker to `bench.{ticker}` and to
+`bench` (as the scrapper does), split over `concurrency` publisher
+tasks of RedisPublishers, `subscribers` RedisSubscribers receive the `bench`
+channel. Publishers and subscribers share this process and its event loop.
+
+Reported per configuration:
+    pub/s      - messages published per second (both channels)
+    recv/s     - messages delivered per second, all subscribers together
+    p50/p99    - publish to receive latency, ms
+    cpu us/msg - cpu of this process per delivered message
+    redis us/msg - redis-server cpu (INFO cpu) per delivered message
+    lost       - messages not delivered before the timeout
+
+Needs a running redis server (docker-compose redis_pubsub by default),
+`--transport memory` runs the same sweep over the in-process broker.
+
+Usage: python src/bench_pubsub.py [--host redis_pubsub] [--port 6380]
+    [--sizes 64 1024] [--tickers 10 100] [--concurrency 1 8]
+    [--subscribers 1 4] [--messages 5000] [--transport redis]
+    [--output results.json]
+"""
+import asyncio
+import json
+import struct
+from argparse import ArgumentParser
+from itertools import product
+from pathlib import Path
+from statistics import median, quantiles
+from time import perf_counter, process_time
+
+from redis.asyncio import Redis
+
+from settings import settings
+from libs.pubsub.memory_broker import MemoryBroker
+from libs.pubsub.publishers import IPublisher, MemoryPublisher, RedisPublisher
+from libs.pubsub.subscribers import ISubscriber, MemorySubscriber, RedisSubscriber
+
+CHANNEL = 'bench'
+TIMESTAMP = struct.Struct('<d')
+RECEIVE_TIMEOUT_SEC = 10
+
+
+class Transport:
+    def __init__(self, name: str, host: str, port: int) -> None:
+        self.name = name
+        self.broker = MemoryBroker()
+        self.redis = Redis(host=host, port=port) if name == 'redis' else None
+
+    def publisher(self, channel: str) -> IPublisher:
+        if self.redis is None:
+            return MemoryPublisher(channel, self.broker)
+        return RedisPublisher(channel, self.redis)
+
+    def subscriber(self, channel: str) -> ISubscriber:
+        if self.redis is None:
+            return MemorySubscriber(channel, self.broker)
+        return RedisSubscriber(
+            channel,
+            self.redis.pubsub(ignore_subscribe_messages=True)
+        )
+
+    async def server_cpu(self) -> float:
+        if self.redis is None:
+            return None
+        info = await self.redis.info('cpu')
+        return info['used_cpu_sys'] + info['used_cpu_user']
+
+    async def subscribed(self, subscribers: int) -> bool:
+        if self.redis is None:
+            return len(self.broker.channels.get(CHANNEL, ())) >= subscribers
+        counts = dict(await self.redis.pubsub_numsub(CHANNEL))
+        return counts.get(CHANNEL.encode(), 0) >= subscribers
+
+
+async def consume(subscriber: ISubscriber, latencies: list[float], expected: int):
+    async for message in subscriber.receive():
+        latencies.append(perf_counter() - TIMESTAMP.unpack_from(message)[0])
+        if len(latencies) >= expected:
+            return
+
+
+async def publish(publishers: list[tuple[IPublisher, IPublisher]], rounds: int, padding: bytes):
+    for _ in range(rounds):
+        for ticker_publisher, base_publisher in publishers:
+            msg = TIMESTAMP.pack(perf_counter()) + padding
+            await ticker_publisher.publish(msg)
+            await base_publisher.publish(msg)
+
+
+async def bench(
+    transport: Transport,
+    size: int,
+    tickers: int,
+    concurrency: int,
+    subscribers: int,
+    messages: int
+) -> dict:
+    rounds = max(messages // tickers, 1)
+    expected = rounds * tickers
+    padding = b'x' * max(size - TIMESTAMP.size, 0)
+
+    latencies = [[] for _ in range(subscribers)]
+    consumers = [
+        asyncio.create_task(consume(transport.subscriber(CHANNEL), lat, expected))
+        for lat in latencies
+    ]
+    while not await transport.subscribed(subscribers):
+        await asyncio.sleep(0.01)
+
+    publishers = [
+        (transport.publisher(f'{CHANNEL}.ticker_{i}'), transport.publisher(CHANNEL))
+        for i in range(tickers)
+    ]
+    shards = [publishers[i::concurrency] for i in range(concurrency)]
+
+    server_cpu = await transport.server_cpu()
+    cpu = process_time()
+    start = perf_counter()
+    await asyncio.gather(*[publish(shard, rounds, padding) for shard in shards if shard])
+    published_sec = perf_counter() - start
+    await asyncio.wait(consumers, timeout=RECEIVE_TIMEOUT_SEC)
+    received_sec = perf_counter() - start
+    cpu = process_time() - cpu
+    if server_cpu is not None:
+        server_cpu = await transport.server_cpu() - server_cpu
+    for consumer in consumers:
+        consumer.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+    all_latencies = [lat * 1000 for lat in sum(latencies, [])]
+    received = len(all_latencies)
+    return {
+        'transport': transport.name,
+        'size': size,
+        'tickers': tickers,
+        'concurrency': concurrency,
+        'subscribers': subscribers,
+        'published': expected * 2,
+        'received': received,
+        'lost': expected * subscribers - received,
+        'pub_per_sec': expected * 2 / published_sec,
+        'recv_per_sec': received / received_sec,
+        'p50_ms': median(all_latencies) if received else None,
+        'p99_ms': quantiles(all_latencies, n=100)[98] if received > 1 else None,
+        'cpu_us_per_msg': cpu / received * 1e6 if received else None,
+        'redis_cpu_us_per_msg': (
+            server_cpu / received * 1e6
+            if received and server_cpu is not None else None
+        ),
+    }
+
+
+def format_row(r: dict) -> str:
+    def num(value, fmt):
+        return format(value, fmt) if value is not None else '-'
+
+    return (
+        f'{r["size"]:>6}{r["tickers"]:>8}{r["concurrency"]:>6}{r["subscribers"]:>6}'
+        f'{r["pub_per_sec"]:>10.0f}{r["recv_per_sec"]:>10.0f}'
+        f'{num(r["p50_ms"], ".3f"):>9}{num(r["p99_ms"], ".3f"):>9}'
+        f'{num(r["cpu_us_per_msg"], ".1f"):>10}{num(r["redis_cpu_us_per_msg"], ".1f"):>10}'
+        f'{r["lost"]:>7}'
+    )
+
+
+async def main():
+    parser = ArgumentParser(description='libs/pubsub throughput and latency benchmark')
+    parser.add_argument('--host', default=settings.redis_pubsub_host)
+    parser.add_argument('--port', type=int, default=settings.redis_pubsub_port)
+    parser.add_argument('--transport', choices=['redis', 'memory'], default='redis')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 1024])
+    parser.add_argument('--tickers', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--messages', type=int, default=5000, help='per subscriber and configuration')
+    parser.add_argument('--output', type=Path, help='write results as json')
+    args = parser.parse_args()
+
+    transport = Transport(args.transport, args.host, args.port)
+    print(
+        f'{"size":>6}{"tickers":>8}{"conc":>6}{"subs":>6}{"pub/s":>10}{"recv/s":>10}'
+        f'{"p50 ms":>9}{"p99 ms":>9}{"cpu us":>10}{"redis us":>10}{"lost":>7}'
+    )
+    results = []
+    configs = product(args.sizes, args.tickers, args.concurrency, args.subscribers)
+    for size, tickers, concurrency, subscribers in configs:
+        r = await bench(transport, size, tickers, concurrency, subscribers, args.messages)
+        results.append(r)
+        print(format_row(r))
+    if transport.redis is not None:
+        await transport.redis.close()
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
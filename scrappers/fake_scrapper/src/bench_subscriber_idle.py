@@ -0,0 +1,84 @@
+"""Idle cpu and delivery latency of RedisSubscriber vs the former
+`get_message()` + `sleep(0)` spin loop
+
+Needs a running redis server (docker-compose redis_pubsub by default).
+
+Usage: python src/bench_subscriber_idle.py
+    [--host redis_pubsub] [--port 6380] [--idle-sec 5] [--messages 1000]
+"""
+import asyncio
+from argparse import ArgumentParser
+from statistics import median, quantiles
+from time import perf_counter, process_time
+
+from redis.asyncio import Redis
+
+from settings import settings
+from libs.pubsub.subscribers import RedisSubscriber
+
+CHANNEL = 'bench.subscriber'
+
+
+class SpinRedisSubscriber(RedisSubscriber):
+    """Subscriber loop as it was before: non-blocking poll + sleep(0)"""
+
+    async def receive(self) -> str:
+        async with self.pubsub as p:
+            await p.subscribe(self.channel)
+            while True:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True)
+                if message is not None:
+                    yield message["data"]
+                await asyncio.sleep(0)
+
+
+async def consume(subscriber: RedisSubscriber, latencies: list[float], expected: int):
+    async for message in subscriber.receive():
+        latencies.append(perf_counter() - float(message))
+        if len(latencies) >= expected:
+            return
+
+
+async def bench(subscriber_cls, redis: Redis, idle_sec: float, messages: int) -> dict:
+    subscriber = subscriber_cls(CHANNEL, redis.pubsub(ignore_subscribe_messages=True))
+    latencies = []
+    task = asyncio.create_task(consume(subscriber, latencies, messages))
+    await asyncio.sleep(0.5)
+
+    cpu = process_time()
+    await asyncio.sleep(idle_sec)
+    idle_cpu = (process_time() - cpu) / idle_sec
+
+    for _ in range(messages):
+        await redis.publish(CHANNEL, repr(perf_counter()))
+        await asyncio.sleep(0.001)
+    await asyncio.wait_for(task, timeout=10)
+    latencies_ms = [lat * 1000 for lat in latencies]
+    return {
+        'idle_cpu': idle_cpu,
+        'p50_ms': median(latencies_ms),
+        'p99_ms': quantiles(latencies_ms, n=100)[98],
+    }
+
+
+async def main():
+    parser = ArgumentParser(description='RedisSubscriber idle cpu benchmark')
+    parser.add_argument('--host', default=settings.redis_pubsub_host)
+    parser.add_argument('--port', type=int, default=settings.redis_pubsub_port)
+    parser.add_argument('--idle-sec', type=float, default=5)
+    parser.add_argument('--messages', type=int, default=1000)
+    args = parser.parse_args()
+
+    redis = Redis(host=args.host, port=args.port)
+    print(f'{"subscriber":<22}{"idle cpu":>10}{"p50 ms":>10}{"p99 ms":>10}')
+    for subscriber_cls in (SpinRedisSubscriber, RedisSubscriber):
+        r = await bench(subscriber_cls, redis, args.idle_sec, args.messages)
+        print(
+            f'{subscriber_cls.__name__:<22}{r["idle_cpu"]:>10.1%}'
+            f'{r["p50_ms"]:>10.3f}{r["p99_ms"]:>10.3f}'
+        )
+    await redis.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+from asyncio import Event
+from time import perf_counter
+
+
+class ConflatingQueue:
+    """Buffer between stocks generation and publishing
+
+    Holds at most one pending stock per ticker: a newer stock for a ticker
+    that was not published yet replaces the stale one, which is dropped
+    and counted in `conflated`. Memory stays bounded by the tickers count
+    however long publishing stalls, and the publisher always gets the
+    latest prices.
+    """
+
+    def __init__(self) -> None:
+        self.pending: dict[str, dict] = {}
+        self.ready = Event()
+        self.conflated = 0
+        self.put_stocks = 0
+        # perf_counter of the oldest pending stock
+        self.pending_since: float = None
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def put_many(self, stocks: list[dict]):
+        if not stocks:
+            return
+        pending = self.pending
+        before = len(pending)
+        for stock in stocks:
+            pending[stock['ticker']] = stock
+        self.put_stocks += len(stocks)
+        self.conflated += before + len(stocks) - len(pending)
+        if self.pending_since is None:
+            self.pending_since = perf_counter()
+        self.ready.set()
+
+    async def get(self) -> tuple[list[dict], float]:
+        """Waits for pending stocks, returns them with the time
+        the oldest of them spent in the queue"""
+        await self.ready.wait()
+        stocks = list(self.pending.values())
+        waited = perf_counter() - self.pending_since
+        self.pending = {}
+        self.pending_since = None
+        self.ready.clear()
+        return stocks, waited
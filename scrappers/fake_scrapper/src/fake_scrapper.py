@@ -1,65 +1,126 @@
 from time import time
-from random import random
 from asyncpg.pool import Pool
 
+import numpy as np
 from settings import settings
-from redis.exceptions import ResponseError
 from libs.redis_async_timeseries import TimeSeries
+from price_models import IPriceModel, RandomWalkModel
+from scrapper_runner import IScrapper
 
 PRICES_TABLE = settings.timescaledb_prices_table
+TIMESERIES_FILTERS = [f'channel={settings.pubsub_channel}']
 
-def generate_movement() -> int:
-    movement = -1 if random() < 0.5 else 1
-    return movement
 
+def timestamp_ms() -> int:
+    return int(time() * 1000)
 
-def generate_new_price(price: int) -> int:
-    movement = generate_movement()
-    price += movement
-    if price < 0:
-        price = 0
-    return price
 
+class FakePriceScrapper(IScrapper):
+    name = 'fake'
 
-class FakePriceScrapper:
     def __init__(
         self,
         redis_timeseries: TimeSeries,
-        timescaledb_timeseries: Pool
+        timescaledb_timeseries: Pool,
+        model: IPriceModel = None
     ) -> None:
         self.redis_timeseries = redis_timeseries
         self.timescaledb_timeseries = timescaledb_timeseries
+        self.model = model if model is not None else RandomWalkModel()
+        # authoritative current prices, storages are read
+        # only on hydrate/resync
+        self.tickers: list[str] = []
+        self.index: dict[str, int] = {}
+        self.prices = np.zeros(0, dtype=np.int64)
+        # tickers that had to be loaded from timescaledb
+        self.timescaledb_fallbacks = 0
 
-    async def get_latest_price(self, ticker) -> int:
-        try:
-            timestamp, price = await self.redis_timeseries.get(ticker)
-        except ResponseError as e:
-            if 'TSDB: the key does not exist' == str(e):
-                try:
-                    async with self.timescaledb_timeseries.acquire() as conn:
-                        q = f"""
-                            SELECT * FROM {PRICES_TABLE}
-                            WHERE ticker=$1
-                            ORDER BY ts DESC LIMIT 1;
-                        """
-                        rows = await conn.fetch(q, ticker)
-                        await conn.close()
-                        if rows:
-                            row = rows[0] 
-                        price = row['price']
-                except Exception as e1:
-                    raise e1
+    async def get_timescaledb_prices(self, tickers: list[str]) -> dict[str, int]:
+        # one set-based lookup over the (ticker, ts DESC) index,
+        # tickers that have no rows yet start from 0 as in fillers init
+        q = f"""
+            SELECT DISTINCT ON (ticker) ticker, price
+            FROM {PRICES_TABLE}
+            WHERE ticker = ANY($1::text[])
+            ORDER BY ticker, ts DESC;
+        """
+        async with self.timescaledb_timeseries.acquire() as conn:
+            stmt = await conn.prepare(q)
+            rows = await stmt.fetch(tickers)
+        self.timescaledb_fallbacks += len(tickers)
+        prices = dict.fromkeys(tickers, 0)
+        for row in rows:
+            prices[row['ticker']] = row['price']
+        return prices
+
+    async def read_prices(self, tickers: list[str]) -> dict[str, int]:
+        # single TS.MGET round trip for all labeled series,
+        # tickers without a sample are loaded from timescaledb at once
+        series = await self.redis_timeseries.mget(TIMESERIES_FILTERS)
+        latest = {}
+        for s in series:
+            for ticker, (_, timestamp, price) in s.items():
+                if price is not None:
+                    latest[ticker] = int(price)
+        prices = {}
+        missing = []
+        for ticker in tickers:
+            price = latest.get(ticker)
+            if price is None:
+                missing.append(ticker)
             else:
-                raise e
-        price = generate_new_price(price)
-        return price
-
-    async def get_latest_stock_status(self, ticker) -> dict:
-        price = await self.get_latest_price(ticker)
-        timestamp = int(time())
-        stock = {
-            'ticker': ticker,
-            'price': price,
-            'timestamp': timestamp
-        }
-        return stock
+                prices[ticker] = price
+        if missing:
+            prices.update(await self.get_timescaledb_prices(missing))
+        return prices
+
+    async def hydrate(self, tickers: list[str]):
+        prices = await self.read_prices(tickers)
+        new = [t for t in tickers if t not in self.index]
+        if new:
+            for t in new:
+                self.index[t] = len(self.tickers)
+                self.tickers.append(t)
+            self.prices = np.concatenate(
+                [self.prices, np.zeros(len(new), dtype=np.int64)]
+            )
+        for t, price in prices.items():
+            self.prices[self.index[t]] = price
+
+    async def resync(self):
+        """Re-reads prices of all held tickers from storages"""
+        await self.hydrate(list(self.tickers))
+
+    def generate_prices(self) -> np.ndarray:
+        # advances the whole hydrated universe in one vectorized step
+        return self.model.step(self.prices)
+
+    async def hydrate_missing(self, tickers: list[str]):
+        missing = [t for t in tickers if t not in self.index]
+        if missing:
+            await self.hydrate(missing)
+
+    def generate_latest_prices(self, tickers: list[str]) -> dict[str, int]:
+        prices = self.generate_prices().tolist()
+        index = self.index
+        return {t: prices[index[t]] for t in tickers}
+
+    def generate_stocks_status(self, tickers: list[str]) -> list[dict]:
+        """Stocks status from in-memory prices, tickers must be hydrated"""
+        prices = self.generate_latest_prices(tickers)
+        timestamp = timestamp_ms()
+        stocks = [
+            {
+                'ticker': ticker,
+                'price': price,
+                'timestamp': timestamp
+            }
+            for ticker, price in prices.items()
+        ]
+        return stocks
+
+    async def fetch(self, tickers: list[str]):
+        await self.hydrate_missing(tickers)
+
+    def get_stocks_status(self, tickers: list[str]) -> list[dict]:
+        return self.generate_stocks_status(tickers)
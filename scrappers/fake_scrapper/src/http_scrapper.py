@@ -0,0 +1,87 @@
+import logging
+from asyncio import Semaphore, Task, create_task, wait
+from asyncio import TimeoutError as AsyncioTimeoutError
+
+import aiohttp
+import orjson
+
+from settings import settings
+from scrapper_runner import IScrapper
+
+LOG = logging.getLogger(settings.log_name)
+
+
+class HttpQuoteScrapper(IScrapper):
+    """Pulls `{"ticker", "price", "timestamp"}` quotes over HTTP
+
+    `url` is a template with a `{ticker}` placeholder. At most
+    `concurrency` requests are in flight, over a pool of `pool_size`
+    keep-alive connections. A ticker that still has a request in flight
+    is not requested again, the next tick waits for the same request
+    instead (coalescing). A tick waits at most `fetch_timeout_sec` for
+    responses, late responses are published on the following tick.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        concurrency: int = 32,
+        pool_size: int = 32,
+        fetch_timeout_sec: float = None
+    ) -> None:
+        self.name = name
+        self.url = url
+        self.concurrency = concurrency
+        self.pool_size = pool_size
+        self.fetch_timeout_sec = fetch_timeout_sec
+        self.session: aiohttp.ClientSession = None
+        self.semaphore: Semaphore = None
+        self.inflight: dict[str, Task] = {}
+        self.quotes: dict[str, dict] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def start(self):
+        self.semaphore = Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size)
+        )
+
+    async def fetch_quote(self, ticker: str):
+        try:
+            async with self.semaphore:
+                self.requests += 1
+                async with self.session.get(self.url.format(ticker=ticker)) as resp:
+                    resp.raise_for_status()
+                    self.quotes[ticker] = orjson.loads(await resp.read())
+        except (aiohttp.ClientError, AsyncioTimeoutError, ValueError) as e:
+            self.errors += 1
+            LOG.debug(f'Source "{self.name}" failed to fetch {ticker}: {e}')
+        finally:
+            del self.inflight[ticker]
+
+    def request(self, ticker: str) -> Task:
+        task = self.inflight.get(ticker)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = create_task(self.fetch_quote(ticker))
+        self.inflight[ticker] = task
+        return task
+
+    async def fetch(self, tickers: list[str]):
+        tasks = [self.request(t) for t in tickers]
+        if tasks:
+            await wait(tasks, timeout=self.fetch_timeout_sec)
+
+    def get_stocks_status(self, tickers: list[str]) -> list[dict]:
+        # only quotes received since the previous tick
+        quotes = self.quotes
+        self.quotes = {}
+        return list(quotes.values())
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
@@ -1,60 +1,196 @@
 from re import I
 import sys
 import logging
-from asyncio import run, create_task, gather, sleep
+from asyncio import Task, create_task, gather, get_running_loop, run
+from signal import SIG_IGN, SIGHUP, signal
+from time import perf_counter
 
-import orjson
 import asyncpg
 from redis.asyncio import Redis
-from redis.asyncio.client import PubSub
 
 from settings import settings
 from fake_scrapper import FakePriceScrapper
-from libs.pubsub.publishers import IPublisher, RedisPublisher
+from http_scrapper import HttpQuoteScrapper
+from scrapper_runner import ScrapperRunner
+from conflating_queue import ConflatingQueue
+from price_models import create_price_model
+from tick_publisher import TickPublisher
+from tick_scheduler import TickScheduler
+from supervisor import ScrapperSupervisor
+from metrics import Histogram, MetricsRegistry, serve_metrics
+from libs.pubsub.codecs import get_codec
+from libs.pubsub.publishers import RedisPublishPool, StreamPublisher
 from libs.redis_async_timeseries import TimeSeries
 
 
 LOG = logging.getLogger(settings.log_name)
 
 
-def create_publishers(base_channel, tickers: list[str], redis_pubsub: PubSub):
-    publishers = [
-        {
-            'ticker': ticker,
-            "publishers":   (
-                RedisPublisher(f'{base_channel}.{ticker}', redis_pubsub),
-                RedisPublisher(base_channel, redis_pubsub)
-            )
-        }
-        for ticker in tickers
-    ]
-    return publishers
+TICK_PHASES = ('fetch', 'generate', 'queue', 'serialize', 'publish')
+# sources are fetched together, a slow HTTP source may hold the tick
+# for this share of the interval, its late quotes go out next tick
+HTTP_FETCH_TIMEOUT_RATIO = 0.5
 
 
-async def publish_task(scrapper: FakePriceScrapper, publishers: list[IPublisher], ticker):
-    stock = await scrapper.get_latest_stock_status(ticker)
-    msg = orjson.dumps(stock)
-    await gather(*[p.publish(msg) for p in publishers])
+def create_metrics(
+    scrapper: FakePriceScrapper,
+    scheduler: TickScheduler,
+    queue: ConflatingQueue,
+    publish_pool: RedisPublishPool
+) -> tuple[MetricsRegistry, dict[str, Histogram]]:
+    registry = MetricsRegistry()
+    phases = {
+        phase: registry.histogram(
+            'scrapper_tick_phase_seconds',
+            'Time spent in each tick phase',
+            {'phase': phase}
+        )
+        for phase in TICK_PHASES
+    }
+    registry.counter(
+        'scrapper_timescaledb_fallbacks_total',
+        'Tickers loaded from TimescaleDB because RedisTimeSeries had no sample',
+        lambda: scrapper.timescaledb_fallbacks
+    )
+    registry.gauge(
+        'scrapper_tickers',
+        'Tickers held by the scrapper',
+        lambda: len(scrapper.tickers)
+    )
+    registry.counter(
+        'scrapper_publish_queue_conflated_total',
+        'Stale stocks dropped because a newer price replaced them before publishing',
+        lambda: queue.conflated
+    )
+    registry.gauge(
+        'scrapper_publish_queue_pending',
+        'Stocks waiting to be published',
+        lambda: len(queue)
+    )
+    for i in range(len(publish_pool.clients)):
+        registry.counter(
+            'scrapper_publish_pool_published_total',
+            'Messages published per pool connection',
+            lambda i=i: publish_pool.published[i],
+            {'connection': i}
+        )
+        registry.gauge(
+            'scrapper_publish_pool_inflight',
+            'Publish commands or pipelines in flight per pool connection',
+            lambda i=i: publish_pool.inflight[i],
+            {'connection': i}
+        )
+    registry.counter(
+        'scrapper_publish_pool_errors_total',
+        'Failed publish commands or pipelines',
+        lambda: publish_pool.errors
+    )
+    stats = {
+        'ticks': ('counter', 'Ticks fired'),
+        'overruns': ('counter', 'Ticks still running at the next deadline'),
+        'skipped_ticks': ('counter', 'Deadlines dropped after overruns'),
+        'last_lateness_sec': ('gauge', 'Lateness of the last tick'),
+        'max_lateness_sec': ('gauge', 'Max tick lateness'),
+    }
+    for key, (type_, help_) in stats.items():
+        getattr(registry, type_)(
+            f'scrapper_scheduler_{key}',
+            help_,
+            lambda key=key: getattr(scheduler, key)
+        )
+    return registry, phases
+
+
+def create_runner(scrapper: FakePriceScrapper, tickers: list[str], worker_id: int) -> ScrapperRunner:
+    runner = ScrapperRunner()
+    runner.add_source(scrapper, tickers)
+    if worker_id != 0:
+        return runner
+    for source in settings.http_sources:
+        runner.add_source(
+            HttpQuoteScrapper(
+                source['name'],
+                source['url'],
+                source.get('concurrency', 32),
+                source.get('pool_size', 32),
+                source.get(
+                    'fetch_timeout_sec',
+                    settings.scrap_interval_sec * HTTP_FETCH_TIMEOUT_RATIO
+                )
+            ),
+            source['tickers']
+        )
+    return runner
+
+
+async def generate_tick(
+    runner: ScrapperRunner,
+    queue: ConflatingQueue,
+    phases: dict[str, Histogram]
+):
+    t0 = perf_counter()
+    await runner.fetch()
+    t1 = perf_counter()
+    queue.put_many(runner.get_stocks_status())
+    t2 = perf_counter()
+    phases['fetch'].observe(t1 - t0)
+    phases['generate'].observe(t2 - t1)
+
+
+async def publish_loop(
+    queue: ConflatingQueue,
+    publisher: TickPublisher,
+    phases: dict[str, Histogram]
+):
+    # runs apart from the tick loop, so a publishing stall makes
+    # the queue conflate prices instead of delaying the ticks
+    while True:
+        stocks, waited = await queue.get()
+        t0 = perf_counter()
+        messages = publisher.serialize(stocks)
+        t1 = perf_counter()
+        await publisher.flush(messages)
+        t2 = perf_counter()
+        phases['queue'].observe(waited)
+        phases['serialize'].observe(t1 - t0)
+        phases['publish'].observe(t2 - t1)
+        LOG.debug(f'{len(stocks)} stocks flushed in {(t2 - t1) * 1000:.2f}ms')
+
 
+async def resync(scrapper: FakePriceScrapper):
+    LOG.info('Resyncing scrapper prices from storages')
+    try:
+        await scrapper.resync()
+    except Exception as e:
+        LOG.error(f'Resync failed, keeping in-memory prices: {e!r}')
 
-def create_tasks(publishers: dict, scrapper: FakePriceScrapper):
-    tasks = []
-    for p in publishers:
-        ticker = p['ticker']
-        pubs = p['publishers']
-        coro = publish_task(scrapper, pubs, ticker)
-        tasks.append(create_task(coro))
-    return tasks
 
+def handle_resync(scrapper: FakePriceScrapper):
+    """SIGHUP re-reads prices from storages without a restart"""
+    tasks: set[Task] = set()
 
-async def main():
+    def on_signal():
+        task = create_task(resync(scrapper))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    get_running_loop().add_signal_handler(SIGHUP, on_signal)
+
+
+async def scrap(tickers: list[str], start: float = None, worker_id: int = 0):
     host = settings.redis_pubsub_host
     port = settings.redis_pubsub_port
-    LOG.info(f'Connecting RedisPubsub "{host}:{port}"')
-    redis_pubsub = Redis(
-        host=host,
-        port=port
-    ).pubsub(ignore_subscribe_messages=True)
+    connections = settings.redis_pubsub_connections
+    LOG.info(f'Connecting RedisPubsub "{host}:{port}" with {connections} connection(s)')
+    publish_pool = RedisPublishPool(host, port, connections)
+    stream_publisher = None
+    if settings.pubsub_stream:
+        LOG.info(f'Appending stocks to "{settings.pubsub_stream}" stream')
+        stream_publisher = StreamPublisher(
+            settings.pubsub_stream,
+            Redis(host=host, port=port),
+            settings.pubsub_stream_maxlen
+        )
 
     host = settings.redis_timeseries_host
     port = settings.redis_timeseries_port
@@ -77,27 +213,69 @@ async def main():
         password=passw,
         database=db,
     )
-    tickers = settings.tickers
     LOG.info(
         'Following tickers will be scrapped:\n'+'\n'.join(tickers)
     )
 
     channel = settings.pubsub_channel
-    publishers = create_publishers(channel, tickers, redis_pubsub)
+    publisher = TickPublisher(
+        channel,
+        publish_pool,
+        settings.pubsub_tick_frames,
+        stream_publisher,
+        get_codec(settings.pubsub_codec),
+        settings.pubsub_sequence,
+        # workers share the base channel, each one has its own sequence
+        worker_id
+    )
     scrap_interval_sec = settings.scrap_interval_sec
     scrapper = FakePriceScrapper(
         redis_timeseries,
-        timescaledb_conn
+        timescaledb_conn,
+        create_price_model(settings.price_model)
     )
+    handle_resync(scrapper)
+    LOG.info('Hydrating scrapper prices from storages')
+    await scrapper.hydrate(tickers)
     LOG.info(
         f'Start publishing stocks info to {channel}, and {channel}.[ticker]'
     )
-    scrap_interval_sec = 1
-    while True:
-        tasks = create_tasks(publishers, scrapper)
-        await gather(*tasks)
-        await sleep(scrap_interval_sec)
+    runner = create_runner(scrapper, tickers, worker_id)
+    await runner.start()
+    scheduler = TickScheduler(scrap_interval_sec)
+    queue = ConflatingQueue()
+    registry, phases = create_metrics(scrapper, scheduler, queue, publish_pool)
+    if settings.metrics_port:
+        await serve_metrics(
+            registry,
+            settings.metrics_host,
+            settings.metrics_port + worker_id
+        )
+    try:
+        await gather(
+            scheduler.run(lambda: generate_tick(runner, queue, phases), start),
+            publish_loop(queue, publisher, phases)
+        )
+    finally:
+        await runner.close()
+
+
+def run_worker(tickers: list[str], start: float, worker_id: int):
+    # a SIGHUP forwarded before scrap handles it must not kill the worker
+    signal(SIGHUP, SIG_IGN)
+    run(scrap(tickers, start, worker_id))
+
+
+def main():
+    tickers = settings.tickers
+    workers = settings.workers
+    if workers <= 1:
+        run(scrap(tickers))
+        return
+    LOG.info(f'Starting {workers} scrapper workers')
+    supervisor = ScrapperSupervisor(run_worker, workers)
+    sys.exit(supervisor.run(tickers))
 
 
 if __name__ == '__main__':
-    run(main())
+    main()
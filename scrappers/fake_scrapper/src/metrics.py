@@ -0,0 +1,123 @@
+"""Low-overhead in-process metrics exposed in prometheus text format
+
+Histograms use fixed buckets, so an observation is one bisect and two
+additions. `serve_metrics` answers `GET /metrics` on a plain asyncio
+server, no extra dependencies are needed.
+"""
+import logging
+from asyncio import StreamReader, StreamWriter, start_server
+from asyncio.base_events import Server
+from bisect import bisect_left
+from typing import Callable
+
+from settings import settings
+
+LOG = logging.getLogger(settings.log_name)
+
+# 50us .. ~13s, doubling
+DEFAULT_BUCKETS = tuple(0.00005 * 2 ** i for i in range(19))
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(f'{k}="{v}"' for k, v in labels.items())
+    return '{' + pairs + '}'
+
+
+class Histogram:
+    def __init__(self, name: str, labels: dict = None, buckets=DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.labels = labels or {}
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def render(self) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, cnt in zip(self.buckets, self.counts):
+            cumulative += cnt
+            labels = format_labels({**self.labels, 'le': f'{bound:g}'})
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = format_labels({**self.labels, 'le': '+Inf'})
+        lines.append(f'{self.name}_bucket{labels} {self.count}')
+        labels = format_labels(self.labels)
+        lines.append(f'{self.name}_sum{labels} {self.sum}')
+        lines.append(f'{self.name}_count{labels} {self.count}')
+        return lines
+
+
+class Metric:
+    """Counter or gauge whose value is read from a callback on render"""
+
+    def __init__(self, name: str, value: Callable[[], float], labels: dict = None) -> None:
+        self.name = name
+        self.value = value
+        self.labels = labels or {}
+
+    def render(self) -> list[str]:
+        return [f'{self.name}{format_labels(self.labels)} {self.value()}']
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        # name -> (type, help, metrics)
+        self.families: dict[str, tuple[str, str, list]] = {}
+
+    def register(self, type_: str, name: str, help_: str, metric):
+        family = self.families.setdefault(name, (type_, help_, []))
+        family[2].append(metric)
+        return metric
+
+    def histogram(self, name: str, help_: str, labels: dict = None) -> Histogram:
+        return self.register('histogram', name, help_, Histogram(name, labels))
+
+    def counter(self, name: str, help_: str, value: Callable[[], float], labels: dict = None):
+        return self.register('counter', name, help_, Metric(name, value, labels))
+
+    def gauge(self, name: str, help_: str, value: Callable[[], float], labels: dict = None):
+        return self.register('gauge', name, help_, Metric(name, value, labels))
+
+    def render(self) -> str:
+        lines = []
+        for name, (type_, help_, metrics) in self.families.items():
+            lines.append(f'# HELP {name} {help_}')
+            lines.append(f'# TYPE {name} {type_}')
+            for m in metrics:
+                lines.extend(m.render())
+        return '\n'.join(lines) + '\n'
+
+
+async def serve_metrics(registry: MetricsRegistry, host: str, port: int) -> Server:
+    async def handle(reader: StreamReader, writer: StreamWriter):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b'GET' and parts[1] == b'/metrics':
+                status = b'200 OK'
+                body = registry.render().encode()
+            else:
+                status = b'404 Not Found'
+                body = b'not found\n'
+            writer.write(
+                b'HTTP/1.1 ' + status + b'\r\n'
+                b'Content-Type: text/plain; version=0.0.4\r\n'
+                b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+                b'Connection: close\r\n\r\n' + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await start_server(handle, host, port)
+    LOG.info(f'Serving metrics on "http://{host}:{port}/metrics"')
+    return server
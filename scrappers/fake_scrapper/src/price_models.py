@@ -0,0 +1,134 @@
+from random import random
+
+import numpy as np
+
+
+def generate_movement() -> int:
+    movement = -1 if random() < 0.5 else 1
+    return movement
+
+
+def generate_new_price(price: int) -> int:
+    movement = generate_movement()
+    price += movement
+    if price < 0:
+        price = 0
+    return price
+
+
+class IPriceModel:
+    def step(self, prices: np.ndarray) -> np.ndarray:
+        ...
+
+    def steps(self, prices: np.ndarray, cnt: int) -> np.ndarray:
+        """Returns `cnt` consecutive steps as a (cnt, tickers) array,
+        `prices` is advanced to the last step"""
+        out = np.empty((cnt, prices.shape[0]), dtype=np.int64)
+        for i in range(cnt):
+            out[i] = self.step(prices)
+        return out
+
+
+class RandomWalkModel(IPriceModel):
+    """Vectorized version of `generate_new_price`: +-1 move, clamped at 0"""
+
+    def __init__(self, rng: np.random.Generator = None) -> None:
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def step(self, prices: np.ndarray) -> np.ndarray:
+        moves = self.rng.integers(0, 2, size=prices.shape[0], dtype=np.int64)
+        moves *= 2
+        moves -= 1
+        prices += moves
+        np.maximum(prices, 0, out=prices)
+        return prices
+
+    def steps(self, prices: np.ndarray, cnt: int) -> np.ndarray:
+        # walk clamped at 0 is the Lindley recursion, its closed form
+        # p[t] = s[t] - min(-p0, min(s[1..t])) over the cumulative moves s
+        # avoids a python loop over ticks
+        walk = self.rng.integers(0, 2, size=(cnt, prices.shape[0]), dtype=np.int64)
+        walk *= 2
+        walk -= 1
+        np.cumsum(walk, axis=0, out=walk)
+        lows = np.minimum.accumulate(walk, axis=0)
+        np.minimum(lows, -prices, out=lows)
+        walk -= lows
+        prices[:] = walk[-1]
+        return walk
+
+
+class GBMModel(IPriceModel):
+    """Geometric brownian motion, rounded to integer prices
+
+    The model is multiplicative, a price of 0 would stay 0 forever:
+    tickers without a price yet (hydrated as 0) start from
+    `initial_price` and prices never go below 1.
+    """
+
+    def __init__(
+        self,
+        mu: float = 0.0,
+        sigma: float = 0.01,
+        dt: float = 1.0,
+        initial_price: int = 100,
+        rng: np.random.Generator = None
+    ) -> None:
+        self.drift = (mu - sigma ** 2 / 2) * dt
+        self.vol = sigma * np.sqrt(dt)
+        self.initial_price = initial_price
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def step(self, prices: np.ndarray) -> np.ndarray:
+        if not prices.all():
+            prices[prices == 0] = self.initial_price
+        shocks = self.rng.standard_normal(prices.shape[0])
+        shocks *= self.vol
+        shocks += self.drift
+        np.exp(shocks, out=shocks)
+        shocks *= prices
+        np.rint(shocks, out=shocks)
+        np.maximum(shocks, 1, out=shocks)
+        prices[:] = shocks
+        return prices
+
+
+class MeanReversionModel(IPriceModel):
+    """Ornstein-Uhlenbeck process around `mean`, clamped at 0"""
+
+    def __init__(
+        self,
+        mean: float = 100.0,
+        theta: float = 0.1,
+        sigma: float = 1.0,
+        dt: float = 1.0,
+        rng: np.random.Generator = None
+    ) -> None:
+        self.mean = mean
+        self.theta = theta * dt
+        self.vol = sigma * np.sqrt(dt)
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def step(self, prices: np.ndarray) -> np.ndarray:
+        moves = self.rng.standard_normal(prices.shape[0])
+        moves *= self.vol
+        moves += self.theta * (self.mean - prices)
+        np.rint(moves, out=moves)
+        prices += moves.astype(np.int64)
+        np.maximum(prices, 0, out=prices)
+        return prices
+
+
+PRICE_MODELS = {
+    'random_walk': RandomWalkModel,
+    'gbm': GBMModel,
+    'mean_reversion': MeanReversionModel,
+}
+
+
+def create_price_model(name: str, **kwargs) -> IPriceModel:
+    try:
+        model_cls = PRICE_MODELS[name]
+    except KeyError:
+        raise ValueError(f'Unknown price model "{name}"')
+    return model_cls(**kwargs)
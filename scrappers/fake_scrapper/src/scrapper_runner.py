@@ -0,0 +1,57 @@
+import logging
+from asyncio import gather
+
+from settings import settings
+
+LOG = logging.getLogger(settings.log_name)
+
+
+class IScrapper:
+    name: str = 'scrapper'
+
+    async def start(self):
+        ...
+
+    async def fetch(self, tickers: list[str]):
+        """I/O part of a tick: storages hydration, quotes requests"""
+        ...
+
+    def get_stocks_status(self, tickers: list[str]) -> list[dict]:
+        """Stocks to publish this tick, built from fetched state"""
+        ...
+
+    async def close(self):
+        ...
+
+
+class ScrapperRunner:
+    """Hosts many scrapper sources that feed one publisher stage
+
+    A tick fetches all sources concurrently and then collects their
+    stocks into a single list for the publisher.
+    """
+
+    def __init__(self) -> None:
+        self.sources: list[tuple[IScrapper, list[str]]] = []
+
+    def add_source(self, scrapper: IScrapper, tickers: list[str]):
+        LOG.info(f'Scrapper source "{scrapper.name}" for {len(tickers)} tickers')
+        self.sources.append((scrapper, tickers))
+
+    async def start(self):
+        await gather(*[s.start() for s, _ in self.sources])
+
+    async def fetch(self):
+        await gather(*[s.fetch(tickers) for s, tickers in self.sources])
+
+    def get_stocks_status(self) -> list[dict]:
+        if len(self.sources) == 1:
+            scrapper, tickers = self.sources[0]
+            return scrapper.get_stocks_status(tickers)
+        stocks = []
+        for scrapper, tickers in self.sources:
+            stocks.extend(scrapper.get_stocks_status(tickers))
+        return stocks
+
+    async def close(self):
+        await gather(*[s.close() for s, _ in self.sources])
@@ -17,7 +17,22 @@ def gen_tickers(cnt: int) -> list[int]:
 
 
 class ScrapperSetttings(BaseSettings):
-    scrap_interval_sec: int = 1
+    # fractions are allowed for sub-second ticks (e.g. 0.1),
+    # messages are stamped with epoch milliseconds
+    scrap_interval_sec: float = 1
+    price_model: str = 'random_walk'
+    # >1 partitions tickers across worker processes
+    workers: int = 1
+    # tick loop metrics, worker N listens on metrics_port + N, 0 disables
+    metrics_host: str = '127.0.0.1'
+    metrics_port: int = 9100
+    # extra HTTP quote sources published along with fake prices
+    # (served by the first worker only), e.g.
+    # [{"name": "stub", "url": "http://localhost:8090/quote/{ticker}",
+    #   "tickers": ["AAA"], "concurrency": 32, "pool_size": 32}]
+    # a tick waits for a source at most its fetch_timeout_sec,
+    # half of scrap_interval_sec by default
+    http_sources: list[dict] = []
 
     redis_timeseries_host = 'redis_timeseries'
     redis_timeseries_port = 6379
@@ -25,8 +40,24 @@ class ScrapperSetttings(BaseSettings):
 
     redis_pubsub_host = 'redis_pubsub'
     redis_pubsub_port = 6380
+    # publishing connections, ticks are flushed over all of them concurrently,
+    # each channel always goes through the same one to keep its order
+    redis_pubsub_connections: int = 1
 
     pubsub_channel = 'stocks'
+    # publish one binary tick frame per tick to pubsub_channel
+    # instead of a json message per stock
+    pubsub_tick_frames: bool = False
+    # per-stock messages codec: json, msgpack or struct,
+    # subscribers detect it from the message header byte
+    pubsub_codec: str = 'json'
+    # stamp messages with per-channel sequence numbers (and the worker id),
+    # subscribers count the messages they lost
+    pubsub_sequence: bool = False
+    # also append base channel messages to this Redis stream
+    # (on the pubsub redis), empty disables
+    pubsub_stream: str = ''
+    pubsub_stream_maxlen: int = 100_000
 
     timescaledb_timeseries_host: str = 'timescaledb_timeseries'
     timescaledb_timeseries_port: int = 5432
@@ -0,0 +1,209 @@
+"""Deterministic seeded simulation for reproducible load benchmarks
+
+Publishes the same byte-identical message stream on every run with the
+same arguments: prices come from a seeded price model, timestamps are
+synthetic (`--start-ts-ms + tick * interval`) and do not depend on the
+wall clock. Ticks skipped by the scheduler under load only delay the
+stream, they never change its content.
+
+A manifest with expected totals and the sha256 of the whole stream is
+written when the run completes, `--dry-run` produces the same manifest
+without publishing anything.
+
+Usage:
+    python src/simulate.py --seed 42 --tickers-cnt 1000 --tick-rate 10
+        --duration-sec 60 [--manifest simulation_manifest.json] [--dry-run]
+"""
+import logging
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from hashlib import sha256
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import orjson
+
+from settings import settings, gen_tickers
+from price_models import PRICE_MODELS, create_price_model
+from tick_publisher import TickPublisher
+from tick_scheduler import TickScheduler
+from libs.pubsub.codecs import ICodec, get_codec
+from libs.pubsub.publishers import RedisPublishPool
+
+LOG = logging.getLogger(settings.log_name)
+
+# 2022-01-01T00:00:00Z
+SIMULATION_EPOCH_MS = 1_640_995_200_000
+
+
+class Simulation:
+    def __init__(
+        self,
+        seed: int,
+        tickers: list[str],
+        model_name: str,
+        initial_price: int,
+        start_ts_ms: int,
+        interval_ms: int
+    ) -> None:
+        rng = np.random.default_rng(seed)
+        self.model = create_price_model(model_name, rng=rng)
+        self.tickers = tickers
+        self.prices = np.full(len(tickers), initial_price, dtype=np.int64)
+        self.start_ts_ms = start_ts_ms
+        self.interval_ms = interval_ms
+        self.tick = 0
+        self.prices_sum = 0
+
+    def next_stocks(self) -> list[dict]:
+        prices = self.model.step(self.prices)
+        self.prices_sum += int(prices.sum())
+        timestamp = self.start_ts_ms + self.tick * self.interval_ms
+        self.tick += 1
+        return [
+            {
+                'ticker': ticker,
+                'price': price,
+                'timestamp': timestamp
+            }
+            for ticker, price in zip(self.tickers, prices.tolist())
+        ]
+
+
+class DigestTickPublisher(TickPublisher):
+    """TickPublisher that hashes and counts everything it publishes,
+    without `pool` messages are only hashed and counted"""
+
+    def __init__(
+        self,
+        base_channel: str,
+        pool: RedisPublishPool = None,
+        tick_frames: bool = False,
+        codec: ICodec = None,
+        sequence: bool = False
+    ) -> None:
+        super().__init__(
+            base_channel,
+            pool,
+            tick_frames,
+            codec=codec,
+            sequence=sequence
+        )
+        self.digest = sha256()
+        self.base_messages = 0
+        self.ticker_messages = 0
+        self.bytes = 0
+
+    def messages(self, stocks: list[dict]) -> Iterator[tuple[str, bytes]]:
+        base_channel = self.base_channel
+        for channel, msg in super().messages(stocks):
+            self.digest.update(channel.encode())
+            self.digest.update(msg)
+            self.bytes += len(msg)
+            if channel == base_channel:
+                self.base_messages += 1
+            else:
+                self.ticker_messages += 1
+            yield channel, msg
+
+    async def publish(self, stocks: list[dict]) -> float:
+        if self.pool is None:
+            for _ in self.messages(stocks):
+                pass
+            return 0.0
+        return await super().publish(stocks)
+
+
+def create_manifest(
+    args: Namespace,
+    simulation: Simulation,
+    publisher: DigestTickPublisher
+) -> dict:
+    ticks = simulation.tick
+    last_ts = simulation.start_ts_ms + (ticks - 1) * simulation.interval_ms
+    return {
+        'seed': args.seed,
+        'model': args.model,
+        'tickers_cnt': len(simulation.tickers),
+        'tick_rate': args.tick_rate,
+        'duration_sec': args.duration_sec,
+        'tick_frames': publisher.tick_frames,
+        'codec': publisher.codec.name,
+        'sequence': publisher.stamper is not None,
+        'channel': publisher.base_channel,
+        'ticks': ticks,
+        'samples': ticks * len(simulation.tickers),
+        'prices_sum': simulation.prices_sum,
+        'first_timestamp_ms': simulation.start_ts_ms,
+        'last_timestamp_ms': last_ts,
+        'base_channel_messages': publisher.base_messages,
+        'ticker_channels_messages': publisher.ticker_messages,
+        'bytes': publisher.bytes,
+        'stream_sha256': publisher.digest.hexdigest(),
+    }
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(description='Deterministic seeded prices simulation')
+    parser.add_argument('--seed', type=int, required=True)
+    parser.add_argument('--tickers-cnt', type=int, required=True)
+    parser.add_argument('--tick-rate', type=float, default=1, help='ticks per second')
+    parser.add_argument('--duration-sec', type=float, required=True)
+    parser.add_argument('--model', choices=list(PRICE_MODELS), default='random_walk')
+    parser.add_argument('--initial-price', type=int, default=100)
+    parser.add_argument('--start-ts-ms', type=int, default=SIMULATION_EPOCH_MS)
+    parser.add_argument('--manifest', type=Path, default=Path('simulation_manifest.json'))
+    parser.add_argument('--dry-run', action='store_true', help='only build the manifest')
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    interval_sec = 1 / args.tick_rate
+    ticks = int(args.duration_sec * args.tick_rate)
+    simulation = Simulation(
+        args.seed,
+        gen_tickers(args.tickers_cnt),
+        args.model,
+        args.initial_price,
+        args.start_ts_ms,
+        round(interval_sec * 1000)
+    )
+    pool = None
+    if not args.dry_run:
+        pool = RedisPublishPool(
+            settings.redis_pubsub_host,
+            settings.redis_pubsub_port,
+            settings.redis_pubsub_connections
+        )
+    publisher = DigestTickPublisher(
+        settings.pubsub_channel,
+        pool,
+        settings.pubsub_tick_frames,
+        get_codec(settings.pubsub_codec),
+        settings.pubsub_sequence
+    )
+
+    async def tick():
+        await publisher.publish(simulation.next_stocks())
+
+    LOG.info(
+        f'Simulating {ticks} ticks of {args.tickers_cnt} tickers '
+        f'with seed {args.seed}'
+    )
+    if args.dry_run:
+        for _ in range(ticks):
+            await tick()
+    else:
+        scheduler = TickScheduler(interval_sec)
+        await scheduler.run(tick, ticks=ticks)
+        LOG.info(f'Simulation scheduler stats: {scheduler.stats()}')
+
+    manifest = create_manifest(args, simulation, publisher)
+    args.manifest.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    LOG.info(f'Simulation manifest written to {args.manifest}')
+
+
+if __name__ == '__main__':
+    run(main())
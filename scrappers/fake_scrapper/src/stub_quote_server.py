@@ -0,0 +1,56 @@
+"""Local stub quote server to benchmark HTTP sources offline
+
+Serves `GET /quote/{ticker}` -> `{"ticker", "price", "timestamp"}` with a
+random walk price per ticker, every response is delayed by `latency_ms`
+plus up to `jitter_ms` to emulate a slow source.
+
+Usage: python src/stub_quote_server.py [--port 8090] [--latency-ms 50]
+"""
+from argparse import ArgumentParser
+from asyncio import sleep
+from random import random
+from time import time
+
+import orjson
+from aiohttp import web
+
+from price_models import generate_new_price
+
+
+def create_app(latency_ms: float = 0, jitter_ms: float = 0) -> web.Application:
+    prices: dict[str, int] = {}
+    stats = {'requests': 0}
+
+    async def quote(request: web.Request) -> web.Response:
+        ticker = request.match_info['ticker']
+        delay = latency_ms + jitter_ms * random()
+        if delay:
+            await sleep(delay / 1000)
+        price = generate_new_price(prices.get(ticker, 100))
+        prices[ticker] = price
+        stats['requests'] += 1
+        body = orjson.dumps({
+            'ticker': ticker,
+            'price': price,
+            'timestamp': int(time() * 1000)
+        })
+        return web.Response(body=body, content_type='application/json')
+
+    app = web.Application()
+    app['stats'] = stats
+    app.router.add_get('/quote/{ticker}', quote)
+    return app
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Stub quote server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    args = parser.parse_args()
+    web.run_app(
+        create_app(args.latency_ms, args.jitter_ms),
+        host=args.host,
+        port=args.port
+    )
@@ -0,0 +1,75 @@
+import logging
+import os
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
+from signal import SIGHUP, signal
+from time import monotonic, sleep
+from typing import Callable
+
+from settings import settings
+
+LOG = logging.getLogger(settings.log_name)
+
+WATCH_INTERVAL_SEC = 1
+
+
+def partition(tickers: list[str], shards: int) -> list[list[str]]:
+    return [tickers[i::shards] for i in range(shards)]
+
+
+class ScrapperSupervisor:
+    """Runs a scrapper worker process per tickers shard
+
+    Workers share the tick grid `start + n * interval` (CLOCK_MONOTONIC
+    is system-wide), so their ticks fire on the same boundaries. If any
+    worker dies, the rest are terminated and the supervisor exits with
+    an error, so the container restart policy starts the whole set again.
+    SIGHUP is forwarded to the workers (prices resync).
+    """
+
+    def __init__(
+        self,
+        worker: Callable[[list[str], float, int], None],
+        workers_cnt: int
+    ) -> None:
+        self.worker = worker
+        self.workers_cnt = workers_cnt
+        self.processes: list[BaseProcess] = []
+
+    def start(self, tickers: list[str]):
+        ctx = get_context('spawn')
+        start = monotonic()
+        for i, shard in enumerate(partition(tickers, self.workers_cnt)):
+            p = ctx.Process(
+                target=self.worker,
+                args=(shard, start, i),
+                name=f'scrapper_worker_{i}',
+            )
+            p.start()
+            LOG.info(f'Started {p.name}[{p.pid}] for {len(shard)} tickers')
+            self.processes.append(p)
+
+    def stop(self):
+        for p in self.processes:
+            if p.is_alive():
+                p.terminate()
+        for p in self.processes:
+            p.join()
+
+    def forward(self, signum, frame):
+        for p in self.processes:
+            if p.is_alive():
+                os.kill(p.pid, signum)
+
+    def run(self, tickers: list[str]) -> int:
+        signal(SIGHUP, self.forward)
+        self.start(tickers)
+        try:
+            while True:
+                for p in self.processes:
+                    if not p.is_alive():
+                        LOG.error(f'{p.name}[{p.pid}] exited with {p.exitcode}')
+                        return 1
+                sleep(WATCH_INTERVAL_SEC)
+        finally:
+            self.stop()
@@ -0,0 +1,127 @@
+from asyncio import gather
+from time import perf_counter
+from typing import Iterator
+
+from libs.pubsub.codecs import ICodec, OrjsonCodec
+from libs.pubsub.frames import encode_tick_frame, encode_tickers
+from libs.pubsub.publishers import RedisPublishPool, StreamPublisher
+from libs.pubsub.sequence import SequenceStamper
+
+
+class TickPublisher:
+    """Publishes all stocks of a tick with a single pipeline flush
+    (a pipeline per connection of the publish pool)
+
+    Every stock is published to `{base_channel}.{ticker}` and to
+    `base_channel`, as separate RedisPublishers did before.
+    With `tick_frames` the base channel gets a single tick frame
+    carrying all stocks of the tick instead.
+    With `stream` the base channel messages are also appended
+    to a Redis stream, for consumer groups.
+    Stocks are encoded with `codec`, json by default.
+    With `sequence` every message is stamped with a per-channel
+    sequence number, for subscribers to detect lost messages, and
+    `publisher_id`, that tells apart publishers of the same channel.
+    """
+
+    def __init__(
+        self,
+        base_channel: str,
+        pool: RedisPublishPool,
+        tick_frames: bool = False,
+        stream: StreamPublisher = None,
+        codec: ICodec = None,
+        sequence: bool = False,
+        publisher_id: int = 0
+    ) -> None:
+        self.base_channel = base_channel
+        self.pool = pool
+        self.tick_frames = tick_frames
+        self.stream = stream
+        self.codec = codec or OrjsonCodec()
+        self.stamper = SequenceStamper(publisher_id) if sequence else None
+        self.channels: dict[str, str] = {}
+        self.frame_tickers: list[str] = []
+        self.frame_tickers_block = b''
+        self.last_flush_sec = 0.0
+
+    def ticker_channel(self, ticker: str) -> str:
+        channel = self.channels.get(ticker)
+        if channel is None:
+            channel = f'{self.base_channel}.{ticker}'
+            self.channels[ticker] = channel
+        return channel
+
+    def tick_frame(self, stocks: list[dict]) -> bytes:
+        tickers = [s['ticker'] for s in stocks]
+        if tickers != self.frame_tickers:
+            self.frame_tickers = tickers
+            self.frame_tickers_block = encode_tickers(tickers)
+        prices = [s['price'] for s in stocks]
+        timestamp = stocks[0]['timestamp'] if stocks else 0
+        return encode_tick_frame(
+            timestamp,
+            tickers,
+            prices,
+            self.frame_tickers_block
+        )
+
+    def frames(self, stocks: list[dict]) -> list[bytes]:
+        # a frame shares one timestamp, stocks from different sources
+        # or conflated ticks are split into a frame per timestamp
+        timestamp = stocks[0]['timestamp'] if stocks else 0
+        if all(s['timestamp'] == timestamp for s in stocks):
+            return [self.tick_frame(stocks)]
+        groups: dict[int, list[dict]] = {}
+        for s in stocks:
+            groups.setdefault(s['timestamp'], []).append(s)
+        return [
+            encode_tick_frame(
+                ts,
+                [s['ticker'] for s in group],
+                [s['price'] for s in group]
+            )
+            for ts, group in groups.items()
+        ]
+
+    def messages(self, stocks: list[dict]) -> Iterator[tuple[str, bytes]]:
+        if self.stamper is None:
+            yield from self.payloads(stocks)
+            return
+        stamp = self.stamper.stamp
+        for channel, msg in self.payloads(stocks):
+            yield channel, stamp(channel, msg)
+
+    def payloads(self, stocks: list[dict]) -> Iterator[tuple[str, bytes]]:
+        base_channel = self.base_channel
+        tick_frames = self.tick_frames
+        encode = self.codec.encode
+        for stock in stocks:
+            msg = encode(stock)
+            yield self.ticker_channel(stock['ticker']), msg
+            if not tick_frames:
+                yield base_channel, msg
+        if tick_frames:
+            for frame in self.frames(stocks):
+                yield base_channel, frame
+
+    def serialize(self, stocks: list[dict]) -> list[tuple[str, bytes]]:
+        return list(self.messages(stocks))
+
+    async def flush(self, messages: list[tuple[str, bytes]]) -> float:
+        start = perf_counter()
+        if self.stream is None:
+            await self.pool.publish_many(messages)
+        else:
+            base_channel = self.base_channel
+            await gather(
+                self.pool.publish_many(messages),
+                self.stream.publish_many([
+                    msg for channel, msg in messages if channel == base_channel
+                ])
+            )
+        self.last_flush_sec = perf_counter() - start
+        return self.last_flush_sec
+
+    async def publish(self, stocks: list[dict]) -> float:
+        return await self.flush(self.serialize(stocks))
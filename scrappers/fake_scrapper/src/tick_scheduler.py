@@ -0,0 +1,86 @@
+import logging
+from asyncio import sleep
+from math import ceil
+from time import monotonic
+from typing import Awaitable, Callable
+
+from settings import settings
+
+LOG = logging.getLogger(settings.log_name)
+
+
+class TickScheduler:
+    """Fires ticks on absolute monotonic deadlines `start + n * interval`
+
+    Time spent in a tick does not shift the following deadlines. When a
+    tick overruns its interval, every deadline that already passed is
+    coalesced into a single immediate tick instead of being queued.
+    """
+
+    def __init__(self, interval_sec: float) -> None:
+        self.interval_sec = interval_sec
+        self.ticks = 0
+        # ticks that were still running at the next deadline
+        self.overruns = 0
+        # deadlines dropped while coalescing after overruns
+        self.skipped_ticks = 0
+        self.last_lateness_sec = 0.0
+        self.max_lateness_sec = 0.0
+        self.total_lateness_sec = 0.0
+
+    def stats(self) -> dict:
+        avg_lateness = self.total_lateness_sec / self.ticks if self.ticks else 0.0
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'skipped_ticks': self.skipped_ticks,
+            'last_lateness_sec': self.last_lateness_sec,
+            'max_lateness_sec': self.max_lateness_sec,
+            'avg_lateness_sec': avg_lateness,
+        }
+
+    def coalesce(self, deadline: float, now: float) -> float:
+        """Returns the latest deadline that is not after `now`"""
+        passed = int((now - deadline) // self.interval_sec)
+        if passed > 0:
+            self.skipped_ticks += passed
+            LOG.warning(
+                f'Scrapper can\'t keep up, skipped {passed} tick(s) '
+                f'({self.skipped_ticks} total)'
+            )
+        return deadline + passed * self.interval_sec
+
+    def align(self, start: float, now: float) -> float:
+        """Returns the first deadline of the `start` grid not before `now`"""
+        if start >= now:
+            return start
+        return start + ceil((now - start) / self.interval_sec) * self.interval_sec
+
+    async def run(
+        self,
+        tick: Callable[[], Awaitable],
+        start: float = None,
+        ticks: int = None
+    ):
+        """Runs forever, or until `ticks` ticks fired when given"""
+        now = monotonic()
+        deadline = now if start is None else self.align(start, now)
+        while ticks is None or self.ticks < ticks:
+            now = monotonic()
+            if now < deadline:
+                await sleep(deadline - now)
+                now = monotonic()
+            lateness = now - deadline
+            self.ticks += 1
+            self.last_lateness_sec = lateness
+            self.total_lateness_sec += lateness
+            if lateness > self.max_lateness_sec:
+                self.max_lateness_sec = lateness
+
+            await tick()
+
+            deadline += self.interval_sec
+            now = monotonic()
+            if now >= deadline:
+                self.overruns += 1
+                deadline = self.coalesce(deadline, now)
@@ -21,7 +21,7 @@ COLORS = [
 
 def get_stock_data(start: datetime, end: datetime, ticker=None):
     def format_date(dt: datetime) -> str:
-        return dt.isoformat(timespec="seconds")
+        return dt.isoformat(timespec="milliseconds")
 
     query = f"SELECT * FROM {PRICES_TABLE_NAME} WHERE ts BETWEEN '{format_date(start)}' AND '{format_date(end)}'"
 
@@ -0,0 +1,131 @@
+"""Process-wide subscription multiplexer
+
+A single connection PSUBSCRIBEs to a channels pattern for the whole
+process. Every message is decoded once, only if some local consumer
+is subscribed to its channel, and its items are fanned out to the
+consumers queues. A consumer queue with the `block` policy holds back
+the whole hub while it is full.
+Sequence numbers of stamped messages are checked for every channel
+and publisher (`gaps`), the decoder gets messages without the sequence envelope.
+A message that fails to decode is logged and skipped (`decode_errors`).
+"""
+import logging
+from asyncio import Task, create_task, sleep
+from typing import Any, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from .consumer_queue import ConsumerQueue
+from .frames import decode_stocks
+from .sequence import GapDetector
+
+# how long get_message blocks on the socket before re-checking
+POLL_TIMEOUT_SEC = 1.0
+RECONNECT_DELAY_SEC = 1.0
+
+LOG = logging.getLogger(__name__)
+
+
+class SubscriptionHub:
+    def __init__(
+        self,
+        redis: Redis,
+        pattern: str,
+        decode: Callable[[bytes], list[Any]] = decode_stocks,
+        poll_timeout_sec: float = POLL_TIMEOUT_SEC
+    ) -> None:
+        self.redis = redis
+        self.pattern = pattern
+        self.decode = decode
+        self.poll_timeout_sec = poll_timeout_sec
+        # channel name bytes, as they come from redis -> consumers
+        self.consumers: dict[bytes, set[ConsumerQueue]] = {}
+        self.task: Task = None
+        self.received = 0
+        self.decoded = 0
+        self.decode_errors = 0
+        self.gaps = GapDetector()
+
+    def subscribe(self, channel: str, queue: ConsumerQueue):
+        """Starts the hub on the first subscription (or restarts it if
+        it stopped), must be called from a running event loop"""
+        if self.task is not None and self.task.done():
+            if not self.task.cancelled() and self.task.exception() is not None:
+                LOG.error(f'Subscription hub stopped: {self.task.exception()!r}')
+            self.task = None
+        if self.task is None:
+            self.task = create_task(self.run())
+        self.consumers.setdefault(channel.encode(), set()).add(queue)
+
+    def unsubscribe(self, channel: str, queue: ConsumerQueue):
+        key = channel.encode()
+        consumers = self.consumers.get(key)
+        if consumers is None:
+            return
+        consumers.discard(queue)
+        if not consumers:
+            del self.consumers[key]
+
+    def stats(self) -> dict:
+        return {
+            'received': self.received,
+            'decoded': self.decoded,
+            'decode_errors': self.decode_errors,
+            **{f'sequence_{k}': v for k, v in self.gaps.stats().items()},
+            'consumers': {
+                channel.decode(): [queue.stats() for queue in queues]
+                for channel, queues in self.consumers.items()
+            },
+        }
+
+    def decode_message(self, channel: bytes, data: bytes) -> list[Any]:
+        """Items of the message, None if no consumer is subscribed
+        to its channel"""
+        data, gap = self.gaps.check(channel, data)
+        if gap is not None:
+            LOG.warning(
+                f'{gap.last - gap.first + 1} messages lost on {channel.decode()} '
+                f'from publisher {gap.publisher}, {self.gaps.missed} in total'
+            )
+        if channel not in self.consumers:
+            return None
+        items = self.decode(data)
+        self.decoded += 1
+        return items
+
+    async def dispatch(self, channel: bytes, data: bytes):
+        self.received += 1
+        try:
+            items = self.decode_message(channel, data)
+        except Exception as e:
+            self.decode_errors += 1
+            LOG.warning(f'Undecodable message on {channel.decode()} skipped: {e!r}')
+            return
+        consumers = self.consumers.get(channel)
+        if items is None or not consumers:
+            return
+        # consumers may unsubscribe while a blocking one is awaited
+        for queue in list(consumers):
+            await queue.put_many(items)
+
+    async def run(self):
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as p:
+                    await p.psubscribe(self.pattern)
+                    while True:
+                        message = await p.get_message(
+                            ignore_subscribe_messages=True,
+                            timeout=self.poll_timeout_sec
+                        )
+                        if message is not None:
+                            await self.dispatch(message['channel'], message['data'])
+            except (RedisConnectionError, OSError) as e:
+                LOG.warning(f'Subscription hub connection lost: {e}')
+            await sleep(RECONNECT_DELAY_SEC)
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
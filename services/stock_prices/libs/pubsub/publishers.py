@@ -1,5 +1,11 @@
+import asyncio
+from typing import Union
+
+from redis.asyncio import BlockingConnectionPool, Redis
 from redis.asyncio.client import PubSub
 
+from .memory_broker import MemoryBroker
+
 
 class IPublisher:
     async def publish(self, msg):
@@ -7,13 +13,284 @@ class IPublisher:
 
 
 class RedisPublisher(IPublisher):
+    """Publishes through `pubsub.execute_command`, a `Redis` client can be
+    passed instead of a `PubSub` to publish over its connection pool"""
+
     def __init__(
         self,
         pub_channel,
-        pubsub: PubSub,
+        pubsub: Union[PubSub, Redis],
     ):
         self.channel = pub_channel
         self.pubsub = pubsub
 
     async def publish(self, msg):
         await self.pubsub.execute_command('PUBLISH', self.channel, msg)
+
+
+class PublishBatcher:
+    """Coalesces PUBLISH calls into pipelines
+
+    Calls are buffered until `window_sec` passed since the first buffered
+    one or `max_batch` calls are buffered, then flushed as one
+    non-transactional pipeline. Every caller waits until its batch is
+    flushed and gets its own PUBLISH reply (or the flush error).
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        window_sec: float = 0.001,
+        max_batch: int = 1000
+    ) -> None:
+        self.redis = redis
+        self.window_sec = window_sec
+        self.max_batch = max_batch
+        self.buffer: list[tuple[str, bytes, asyncio.Future]] = []
+        self.timer: asyncio.TimerHandle = None
+        self.flushes: set[asyncio.Task] = set()
+        self.flushed_batches = 0
+        self.flushed_messages = 0
+
+    async def publish(self, channel, msg) -> int:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.buffer.append((channel, msg, future))
+        if len(self.buffer) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window_sec, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        task = asyncio.create_task(self.execute(batch))
+        self.flushes.add(task)
+        task.add_done_callback(self.flushes.discard)
+
+    async def execute(self, batch: list[tuple[str, bytes, asyncio.Future]]):
+        pipe = self.redis.pipeline(transaction=False)
+        for channel, msg, _ in batch:
+            pipe.publish(channel, msg)
+        try:
+            replies = await pipe.execute()
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.flushed_batches += 1
+        self.flushed_messages += len(batch)
+        for (_, _, future), reply in zip(batch, replies):
+            if not future.done():
+                future.set_result(reply)
+
+    async def close(self):
+        self.flush()
+        if self.flushes:
+            await asyncio.gather(*self.flushes, return_exceptions=True)
+
+
+class BatchingRedisPublisher(IPublisher):
+    """RedisPublisher drop-in whose publishes are coalesced by a
+    PublishBatcher, that can be shared by publishers of many channels"""
+
+    def __init__(
+        self,
+        pub_channel,
+        batcher: PublishBatcher,
+    ):
+        self.channel = pub_channel
+        self.batcher = batcher
+
+    async def publish(self, msg):
+        await self.batcher.publish(self.channel, msg)
+
+
+class RedisPublishPool:
+    """Dedicated regular connections for publishing
+
+    Unlike a `PubSub` object, that owns a single connection, the pool
+    holds `connections` clients with a connection each, so publish
+    throughput is not bound to one socket. Every channel is published
+    through the same connection, `publish_many` splits messages into
+    a pipeline per connection and flushes them concurrently.
+    Commands and pipelines of a connection are queued on call and sent
+    one at a time by its writer task, over the single socket of the
+    client pool, so messages of a channel keep their call order
+    (sequence gap detection relies on it).
+    """
+
+    def __init__(self, host: str, port: int, connections: int = 1) -> None:
+        # not single_connection_client, its pipelines take
+        # another socket from the client pool
+        self.clients = [
+            Redis(connection_pool=BlockingConnectionPool(
+                host=host,
+                port=port,
+                max_connections=1,
+                timeout=None
+            ))
+            for _ in range(connections)
+        ]
+        # created with the writers, on the first call from the event loop
+        self.queues: list[asyncio.Queue] = None
+        self.writers: list[asyncio.Task] = None
+        self.inflight = [0] * connections
+        self.published = [0] * connections
+        self.pipelines = 0
+        self.errors = 0
+
+    def connection(self, channel) -> int:
+        # str hashes are salted per process, which is fine,
+        # the order only matters within one publisher
+        return hash(channel) % len(self.clients)
+
+    def submit(self, i: int, command, count: int) -> asyncio.Future:
+        """Queues `command` (an awaitable factory) publishing `count`
+        messages on connection `i`, the future gets its reply"""
+        if self.writers is None:
+            self.queues = [asyncio.Queue() for _ in self.clients]
+            self.writers = [
+                asyncio.create_task(self.write(i))
+                for i in range(len(self.clients))
+            ]
+        future = asyncio.get_running_loop().create_future()
+        self.queues[i].put_nowait((command, count, future))
+        self.inflight[i] += 1
+        return future
+
+    async def write(self, i: int):
+        queue = self.queues[i]
+        while True:
+            command, count, future = await queue.get()
+            try:
+                reply = await command()
+            except Exception as e:
+                self.errors += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.published[i] += count
+                if not future.done():
+                    future.set_result(reply)
+            finally:
+                self.inflight[i] -= 1
+
+    async def publish(self, channel, msg) -> int:
+        i = self.connection(channel)
+        return await self.submit(
+            i,
+            lambda: self.clients[i].publish(channel, msg),
+            1
+        )
+
+    async def flush(self, pipe) -> list[int]:
+        replies = await pipe.execute()
+        self.pipelines += 1
+        return replies
+
+    def execute(self, i: int, messages: list[tuple[str, bytes]]) -> asyncio.Future:
+        pipe = self.clients[i].pipeline(transaction=False)
+        for channel, msg in messages:
+            pipe.publish(channel, msg)
+        return self.submit(i, lambda: self.flush(pipe), len(messages))
+
+    async def publish_many(self, messages: list[tuple[str, bytes]]):
+        size = len(self.clients)
+        if size == 1:
+            await self.execute(0, messages)
+            return
+        partitions = [[] for _ in range(size)]
+        connection = self.connection
+        for channel, msg in messages:
+            partitions[connection(channel)].append((channel, msg))
+        # queued right away, before the first await
+        await asyncio.gather(*[
+            self.execute(i, partition)
+            for i, partition in enumerate(partitions)
+            if partition
+        ])
+
+    def stats(self) -> dict:
+        return {
+            'connections': len(self.clients),
+            'inflight': sum(self.inflight),
+            'published': sum(self.published),
+            'published_per_connection': list(self.published),
+            'pipelines': self.pipelines,
+            'errors': self.errors,
+        }
+
+    async def close(self):
+        if self.writers is not None:
+            for writer in self.writers:
+                writer.cancel()
+            await asyncio.gather(*self.writers, return_exceptions=True)
+            self.writers = None
+        await asyncio.gather(*[
+            c.close(close_connection_pool=True) for c in self.clients
+        ])
+
+
+# field holding the message payload in stream entries, bytes
+# as entries are read back with undecoded field names
+STREAM_DATA_FIELD = b'data'
+STREAM_MAXLEN = 100_000
+
+
+class StreamPublisher(IPublisher):
+    """Appends messages to a Redis stream instead of publishing them
+
+    Entries are kept for subscribers that are offline (a consumer group
+    resumes from its last acknowledged entry), the stream is trimmed to
+    about `maxlen` entries with `XADD MAXLEN ~`, which only drops whole
+    macro nodes and is much cheaper than exact trimming.
+    """
+
+    def __init__(
+        self,
+        stream: str,
+        redis: Redis,
+        maxlen: int = STREAM_MAXLEN,
+    ):
+        self.stream = stream
+        self.redis = redis
+        self.maxlen = maxlen
+
+    async def publish(self, msg):
+        await self.redis.xadd(
+            self.stream,
+            {STREAM_DATA_FIELD: msg},
+            maxlen=self.maxlen,
+            approximate=True
+        )
+
+    async def publish_many(self, msgs: list[bytes]):
+        pipe = self.redis.pipeline(transaction=False)
+        for msg in msgs:
+            pipe.xadd(
+                self.stream,
+                {STREAM_DATA_FIELD: msg},
+                maxlen=self.maxlen,
+                approximate=True
+            )
+        await pipe.execute()
+
+
+class MemoryPublisher(IPublisher):
+    def __init__(
+        self,
+        pub_channel,
+        broker: MemoryBroker,
+    ):
+        self.channel = pub_channel
+        self.broker = broker
+
+    async def publish(self, msg):
+        self.broker.publish(self.channel, msg)
@@ -3,7 +3,12 @@ from fastapi import APIRouter, WebSocket
 from typing import Optional
 from datetime import datetime
 
-from service import get_tickers, get_stock_history, stock_price_realtime
+from service import (
+    get_tickers,
+    get_stock_history,
+    get_pubsub_stats,
+    stock_price_realtime
+)
 from .models import TickersModel, StockHistoryModel
 from settings import settings
 
@@ -17,6 +22,11 @@ async def get_tickers_():
     return await get_tickers()
 
 
+@router.get('/pubsub/stats')
+async def get_pubsub_stats_():
+    return get_pubsub_stats()
+
+
 @router.get('/{ticker}', response_model=StockHistoryModel)
 async def get_stock_history_(
         ticker,
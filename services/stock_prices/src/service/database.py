@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.engine import URL
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
@@ -30,7 +30,7 @@ class StockPricesTable(Base):
     __tablename__ = 'prices'
     ticker = Column(String)
     price = Column(Integer)
-    ts = Column(Date, primary_key=True)
+    ts = Column(DateTime, primary_key=True)
 
 
 class TickersTable(Base):
@@ -1,7 +1,30 @@
+import orjson
 from redis.asyncio import Redis
+
 from settings import settings
+from libs.pubsub.codecs import OrjsonCodec
+from libs.pubsub.frames import decode_stocks
+from libs.pubsub.hub import SubscriptionHub
+
+
+def decode_stock_messages(data: bytes) -> list[tuple[str, str]]:
+    """(ticker, json text) per stock, json as websocket clients receive it,
+    the ticker is the key of conflating websocket queues"""
+    if data[:1] == OrjsonCodec.header:
+        return [(orjson.loads(data)['ticker'], data.decode())]
+    return [
+        (stock['ticker'], orjson.dumps(stock).decode())
+        for stock in decode_stocks(data)
+    ]
+
 
-redis_pubsub_pool = Redis(
+# one PSUBSCRIBE connection shared by all websockets of the process,
+# every message is decoded once for all of them
+subscription_hub = SubscriptionHub(
+    Redis(
         host=settings.redis_pubsub_host,
         port=settings.redis_pubsub_port,
-).pubsub(ignore_subscribe_messages=True)
\ No newline at end of file
+    ),
+    f'{settings.pubsub_channel}*',
+    decode_stock_messages
+)
@@ -1,13 +1,15 @@
 import logging
+from operator import itemgetter
 from datetime import datetime
 
 from fastapi import WebSocket
 from sqlalchemy.future import select
 
 from settings import settings
-from libs.pubsub.subscribers import RedisSubscriber
+from libs.pubsub.consumer_queue import ConsumerQueue
+from libs.pubsub.subscribers import HubSubscriber
 from .database import create_async_session, StockPricesTable, TickersTable
-from .pubsub import redis_pubsub_pool
+from .pubsub import subscription_hub
 
 
 log = logging.getLogger(settings.log_name)
@@ -51,6 +53,22 @@ async def stock_price_realtime(
 ):
     pubsub_channel = f'{default_pubsub_channel}.{ticker}' if ticker else default_pubsub_channel
     await websocket.accept()
-    subscriber = RedisSubscriber(pubsub_channel, redis_pubsub_pool)
-    async for message in subscriber.receive():
-        await websocket.send_text(message)
+    queue = ConsumerQueue(
+        settings.websocket_buffer_size,
+        settings.websocket_queue_policy,
+        key=itemgetter(0)
+    )
+    subscriber = HubSubscriber(pubsub_channel, subscription_hub, queue)
+    messages = subscriber.receive()
+    try:
+        async for _, message in messages:
+            await websocket.send_text(message)
+    finally:
+        # leaves the hub as soon as the websocket is gone
+        await messages.aclose()
+
+
+def get_pubsub_stats() -> dict:
+    """Subscription hub counters with occupancy and losses
+    of every websocket queue"""
+    return subscription_hub.stats()
@@ -25,6 +25,12 @@ class FillersSetttings(BaseSettings):
     redis_pubsub_port = 6380
 
     pubsub_channel = 'stocks'
+    # stocks buffered per websocket and what happens when a client
+    # cannot keep up: drop_oldest, conflate (latest price per ticker,
+    # one pending stock per ticker whatever the buffer size)
+    # or block (holds back every websocket of the process)
+    websocket_buffer_size: int = 10_000
+    websocket_queue_policy: str = 'conflate'
 
     timescaledb_timeseries_host:str = 'timescaledb_timeseries'
     timescaledb_timeseries_port:int = 5432
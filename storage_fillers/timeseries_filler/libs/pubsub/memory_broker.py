@@ -0,0 +1,69 @@
+"""In-process pub/sub for single-node deployments and benchmarks
+
+Channels and glob patterns (`stocks*`, as PSUBSCRIBE) are routed to
+subscriber asyncio queues, messages are handed over as they are
+published, without serialization or copies.
+"""
+from asyncio import Queue, QueueFull
+from fnmatch import fnmatchcase
+
+
+class MemoryBroker:
+    def __init__(self, maxsize: int = 0) -> None:
+        # per subscriber queue size, a full queue drops new messages
+        # (as redis disconnects subscribers over the output buffer limit)
+        self.maxsize = maxsize
+        self.channels: dict[str, set[Queue]] = {}
+        self.patterns: dict[str, set[Queue]] = {}
+        # channel -> queues of channel and matching patterns subscribers
+        self.routes: dict[str, list[Queue]] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, channel: str) -> Queue:
+        return self.add(self.channels, channel)
+
+    def psubscribe(self, pattern: str) -> Queue:
+        return self.add(self.patterns, pattern)
+
+    def add(self, subscriptions: dict[str, set[Queue]], key: str) -> Queue:
+        queue = Queue(self.maxsize)
+        subscriptions.setdefault(key, set()).add(queue)
+        self.routes.clear()
+        return queue
+
+    def unsubscribe(self, queue: Queue):
+        for subscriptions in (self.channels, self.patterns):
+            for key, queues in list(subscriptions.items()):
+                queues.discard(queue)
+                if not queues:
+                    del subscriptions[key]
+        self.routes.clear()
+
+    def route(self, channel: str) -> list[Queue]:
+        queues = self.routes.get(channel)
+        if queues is None:
+            queues = list(self.channels.get(channel, ()))
+            for pattern, pattern_queues in self.patterns.items():
+                if fnmatchcase(channel, pattern):
+                    queues.extend(pattern_queues)
+            self.routes[channel] = queues
+        return queues
+
+    def publish(self, channel: str, msg) -> int:
+        """Returns the number of subscribers that got the message"""
+        self.published += 1
+        receivers = 0
+        for queue in self.route(channel):
+            try:
+                queue.put_nowait(msg)
+                receivers += 1
+            except QueueFull:
+                self.dropped += 1
+        return receivers
+
+    async def publish_many(self, messages: list[tuple[str, object]]):
+        """Same as `RedisPublishPool.publish_many`, so the broker can
+        stand in for the pool in TickPublisher"""
+        for channel, msg in messages:
+            self.publish(channel, msg)
@@ -0,0 +1,105 @@
+"""Per-channel sequence numbers for loss detection
+
+A stamped message is wrapped in an envelope:
+    header  - marker byte 0x03, uint16 little-endian publisher id,
+              uint64 little-endian sequence number
+    payload - the message as it would be published without stamping
+Sequences start at 1 for every channel of a publisher, subscribers
+compare consecutive numbers of the same publisher to count messages
+lost on the way (e.g. dropped by redis over `client-output-buffer-limit`).
+Publishers of the same channel (e.g. scrapper workers) must have
+different ids.
+"""
+import struct
+from collections import deque
+from typing import NamedTuple, Union
+
+SEQUENCE_MARKER = b'\x03'
+SEQUENCE_HEADER = struct.Struct('<cHQ')
+# most recent gaps kept for inspection / backfill
+MAX_RECENT_GAPS = 100
+
+
+class Gap(NamedTuple):
+    channel: Union[str, bytes]
+    publisher: int
+    # first and last missed sequence numbers
+    first: int
+    last: int
+
+
+class SequenceStamper:
+    def __init__(self, publisher: int = 0) -> None:
+        self.publisher = publisher
+        self.sequences: dict[str, int] = {}
+
+    def stamp(self, channel: str, msg: bytes) -> bytes:
+        seq = self.sequences.get(channel, 0) + 1
+        self.sequences[channel] = seq
+        return SEQUENCE_HEADER.pack(SEQUENCE_MARKER, self.publisher, seq) + msg
+
+
+def split_sequence(data: bytes) -> tuple[int, int, bytes]:
+    """Returns the publisher id and the sequence number (None for
+    messages that were not stamped) and the payload"""
+    if data[:1] != SEQUENCE_MARKER:
+        return None, None, data
+    _, publisher, seq = SEQUENCE_HEADER.unpack_from(data)
+    return publisher, seq, data[SEQUENCE_HEADER.size:]
+
+
+class GapDetector:
+    """Counts messages lost between consecutive sequence numbers
+    of every channel and publisher
+
+    A sequence lower than or equal to the last one seen means the
+    publisher restarted, the channel is tracked from there again
+    and the restart is counted in `resets`.
+    """
+
+    def __init__(self) -> None:
+        # (channel name as the caller has it, str or bytes, publisher id)
+        self.last: dict[tuple[Union[str, bytes], int], int] = {}
+        self.received = 0
+        self.gaps = 0
+        self.missed = 0
+        self.resets = 0
+        self.recent_gaps: deque[Gap] = deque(maxlen=MAX_RECENT_GAPS)
+
+    def observe(self, channel: Union[str, bytes], publisher: int, seq: int) -> Gap:
+        """Returns the gap `seq` closes, if any"""
+        self.received += 1
+        key = (channel, publisher)
+        last = self.last.get(key)
+        self.last[key] = seq
+        if last is None or seq == last + 1:
+            return None
+        if seq <= last:
+            self.resets += 1
+            return None
+        gap = Gap(channel, publisher, last + 1, seq - 1)
+        self.gaps += 1
+        self.missed += seq - last - 1
+        self.recent_gaps.append(gap)
+        return gap
+
+    def check(self, channel: Union[str, bytes], data: bytes) -> tuple[bytes, Gap]:
+        """Strips the sequence envelope, returns the payload
+        and the gap the message closes"""
+        publisher, seq, payload = split_sequence(data)
+        if seq is None:
+            return payload, None
+        return payload, self.observe(channel, publisher, seq)
+
+    def loss_rate(self) -> float:
+        total = self.received + self.missed
+        return self.missed / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'received': self.received,
+            'gaps': self.gaps,
+            'missed': self.missed,
+            'resets': self.resets,
+            'loss_rate': self.loss_rate(),
+        }
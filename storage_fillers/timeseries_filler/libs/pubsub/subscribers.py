@@ -1,27 +1,295 @@
-import asyncio
+from asyncio import Queue, Task, TimeoutError, create_task, wait_for
+from time import monotonic
+
+from redis.asyncio import Redis
 from redis.asyncio.client import PubSub
+from redis.exceptions import ResponseError
+
+from .consumer_queue import ConsumerQueue
+from .hub import POLL_TIMEOUT_SEC, SubscriptionHub
+from .memory_broker import MemoryBroker
+from .publishers import STREAM_DATA_FIELD
+
+# entries read (and acknowledged) at once by StreamSubscriber.receive
+STREAM_READ_COUNT = 100
 
 
 class ISubscriber:
     async def receive(self) -> str:
         ...
 
+    async def receive_batch(self, max_items: int, max_wait: float = 0.0) -> list[str]:
+        ...
+
 
 class RedisSubscriber(ISubscriber):
+    """With `queue` the subscription is drained into the queue by a
+    background task, a slow consumer fills the queue (and its policy
+    decides what is lost) instead of leaving messages buffered in redis"""
+
     def __init__(
         self,
         sub_channel,
-        pubsub_pool: PubSub
+        pubsub_pool: PubSub,
+        poll_timeout_sec: float = POLL_TIMEOUT_SEC,
+        queue: ConsumerQueue = None
     ) -> None:
         self.channel = sub_channel
         self.pubsub: PubSub = pubsub_pool
+        self.poll_timeout_sec = poll_timeout_sec
+        self.queue = queue
+
+    def start_reader(self) -> Task:
+        async def read():
+            async for data in self.messages():
+                await self.queue.put(data)
+
+        def done(task: Task):
+            if not task.cancelled() and task.exception() is not None:
+                self.queue.fail(task.exception())
+
+        reader = create_task(read())
+        reader.add_done_callback(done)
+        return reader
 
     async def receive(self) -> str:
+        if self.queue is None:
+            async for data in self.messages():
+                yield data
+            return
+        reader = self.start_reader()
+        try:
+            while True:
+                yield await self.queue.get()
+        finally:
+            reader.cancel()
+
+    async def messages(self) -> str:
         async with self.pubsub as p:
             await p.subscribe(self.channel)
             while True:
-                message = await self.pubsub.get_message(ignore_subscribe_messages=True)
+                # waits for socket readiness instead of spinning,
+                # an idle subscriber does not consume cpu
+                message = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=self.poll_timeout_sec
+                )
                 if message is not None:
                     yield message["data"]
-                await asyncio.sleep(0)
-                
+
+    async def receive_batch(self, max_items: int, max_wait: float = 0.0) -> list[str]:
+        """Yields lists of up to `max_items` payloads
+
+        A batch starts with the next message and takes whatever is
+        already buffered on the connection, waiting at most `max_wait`
+        seconds for more messages to fill it.
+        """
+        if self.queue is not None:
+            reader = self.start_reader()
+            try:
+                while True:
+                    yield await self.queue.get_batch(max_items, max_wait)
+            finally:
+                reader.cancel()
+        async with self.pubsub as p:
+            await p.subscribe(self.channel)
+            while True:
+                message = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=self.poll_timeout_sec
+                )
+                if message is None:
+                    continue
+                batch = [message["data"]]
+                deadline = monotonic() + max_wait
+                while len(batch) < max_items:
+                    timeout = max(deadline - monotonic(), 0.0)
+                    message = await self.pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=timeout
+                    )
+                    if message is None:
+                        break
+                    batch.append(message["data"])
+                yield batch
+
+
+class StreamSubscriber(ISubscriber):
+    """Reads a Redis stream as a consumer of a consumer group
+
+    Subscribers sharing `group` split the stream entries between them,
+    every group gets all of them. Entries are acknowledged with a single
+    XACK per batch once the batch was handled (the caller asked for the
+    next one), so delivery is at-least-once: entries delivered to
+    `consumer` but not acknowledged before a restart are read again from
+    its pending list first, then new entries follow. `consumer` must
+    stay the same between restarts for that.
+    """
+
+    def __init__(
+        self,
+        stream: str,
+        redis: Redis,
+        group: str,
+        consumer: str,
+        poll_timeout_sec: float = POLL_TIMEOUT_SEC,
+        start_id: str = '$'
+    ) -> None:
+        self.stream = stream
+        self.redis = redis
+        self.group = group
+        self.consumer = consumer
+        self.poll_timeout_sec = poll_timeout_sec
+        # where a newly created group starts, '$' - new entries only
+        self.start_id = start_id
+        self.acked = 0
+
+    async def create_group(self):
+        try:
+            await self.redis.xgroup_create(
+                self.stream,
+                self.group,
+                id=self.start_id,
+                mkstream=True
+            )
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise e
+
+    async def read(self, count: int, block_sec: float = None, pending: bool = False) -> list[tuple]:
+        """Returns up to `count` (entry id, payload) pairs, payload is None
+        for pending entries trimmed from the stream meanwhile"""
+        block = None if block_sec is None else max(int(block_sec * 1000), 1)
+        reply = await self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: '0' if pending else '>'},
+            count=count,
+            block=block
+        )
+        if not reply:
+            return []
+        _, entries = reply[0]
+        return [
+            (entry_id, fields.get(STREAM_DATA_FIELD) if fields else None)
+            for entry_id, fields in entries
+        ]
+
+    async def ack(self, entry_ids: list):
+        if entry_ids:
+            await self.redis.xack(self.stream, self.group, *entry_ids)
+            self.acked += len(entry_ids)
+
+    async def receive(self) -> str:
+        async for batch in self.receive_batch(STREAM_READ_COUNT):
+            for data in batch:
+                yield data
+
+    async def receive_batch(self, max_items: int, max_wait: float = 0.0) -> list[str]:
+        """Yields lists of up to `max_items` payloads, waiting at most
+        `max_wait` seconds for more entries once a batch started"""
+        await self.create_group()
+        pending = True
+        while True:
+            if pending:
+                entries = await self.read(max_items, pending=True)
+                if not entries:
+                    pending = False
+                    continue
+            else:
+                entries = await self.read(max_items, self.poll_timeout_sec)
+                if not entries:
+                    continue
+                deadline = monotonic() + max_wait
+                while len(entries) < max_items:
+                    timeout = deadline - monotonic()
+                    if timeout <= 0:
+                        break
+                    more = await self.read(max_items - len(entries), timeout)
+                    if not more:
+                        break
+                    entries.extend(more)
+            batch = [data for _, data in entries if data is not None]
+            if batch:
+                yield batch
+            await self.ack([entry_id for entry_id, _ in entries])
+
+
+class MemorySubscriber(ISubscriber):
+    """Subscribes to a MemoryBroker channel, or to a glob pattern
+    of channels with `pattern`"""
+
+    def __init__(
+        self,
+        sub_channel,
+        broker: MemoryBroker,
+        pattern: bool = False
+    ) -> None:
+        self.channel = sub_channel
+        self.broker = broker
+        self.pattern = pattern
+
+    def subscribe(self) -> Queue:
+        if self.pattern:
+            return self.broker.psubscribe(self.channel)
+        return self.broker.subscribe(self.channel)
+
+    async def receive(self) -> str:
+        queue = self.subscribe()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.broker.unsubscribe(queue)
+
+    async def receive_batch(self, max_items: int, max_wait: float = 0.0) -> list[str]:
+        queue = self.subscribe()
+        try:
+            while True:
+                batch = [await queue.get()]
+                deadline = monotonic() + max_wait
+                while len(batch) < max_items:
+                    if not queue.empty():
+                        batch.append(queue.get_nowait())
+                        continue
+                    timeout = deadline - monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await wait_for(queue.get(), timeout))
+                    except TimeoutError:
+                        break
+                yield batch
+        finally:
+            self.broker.unsubscribe(queue)
+
+
+class HubSubscriber(ISubscriber):
+    """Receives `sub_channel` items from a process-wide SubscriptionHub,
+    already decoded by the hub, through its own `queue`"""
+
+    def __init__(
+        self,
+        sub_channel,
+        hub: SubscriptionHub,
+        queue: ConsumerQueue = None
+    ) -> None:
+        self.channel = sub_channel
+        self.hub = hub
+        self.queue = queue if queue is not None else ConsumerQueue()
+
+    async def receive(self):
+        self.hub.subscribe(self.channel, self.queue)
+        try:
+            while True:
+                yield await self.queue.get()
+        finally:
+            self.hub.unsubscribe(self.channel, self.queue)
+
+    async def receive_batch(self, max_items: int, max_wait: float = 0.0) -> list:
+        self.hub.subscribe(self.channel, self.queue)
+        try:
+            while True:
+                yield await self.queue.get_batch(max_items, max_wait)
+        finally:
+            self.hub.unsubscribe(self.channel, self.queue)
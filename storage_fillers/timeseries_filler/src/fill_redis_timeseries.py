@@ -1,52 +1,140 @@
 import logging
 from time import time
 
-import orjson
 from redis.asyncio import Redis
+from redis.exceptions import ResponseError
 
 from settings import settings
-from libs.pubsub.subscribers import RedisSubscriber
+from subscription import create_sequence_checker, create_subscriber
 from libs.redis_async_timeseries import TimeSeries
 
 DUPLICATE_POLICY = 'last'
 RETENTION_PERIOD_SEC = settings.redis_timeseries_retention_period_sec * 1000
+CHANNEL_LABEL = 'channel'
+TICKER_LABEL = 'ticker'
+KEY_MISSING_ERROR = 'the key does not exist'
+STREAM_GROUP = 'redis_timeseries'
 LOG = logging.getLogger(settings.log_name)
 
 
+def ticker_labels(ticker: str) -> dict:
+    return {
+        CHANNEL_LABEL: settings.pubsub_channel,
+        TICKER_LABEL: ticker
+    }
+
+
 async def init_redis_timeseries(timeseries: TimeSeries, tickers: list[str]):
     LOG.info('RedisTimeseries init tickers prices')
     for t in tickers:
+        labels = ticker_labels(t)
         try:
             info = await timeseries.info(t)
             if info:
+                # series created before labels were introduced
+                # must be labeled to be visible for TS.MGET filters
+                await timeseries.alter(t, labels=labels)
                 continue
-            await timeseries.create(
-                t,
-                retention_period=RETENTION_PERIOD_SEC,
-                duplicate_policy=DUPLICATE_POLICY
-            )
         except Exception as e:
-            if 'the key does not exist' not in str(e):
+            if KEY_MISSING_ERROR not in str(e):
                 raise e
+        await create_ticker_ts(timeseries, t)
+
+
+async def create_ticker_ts(timeseries: TimeSeries, ticker: str):
+    await timeseries.create(
+        ticker,
+        retention_msecs=RETENTION_PERIOD_SEC,
+        duplicate_policy=DUPLICATE_POLICY,
+        labels=ticker_labels(ticker)
+    )
 
 
 async def add_to_redis_ts(redis_timeseries: TimeSeries, stock: dict):
+    # TS.ADD creates a missing series, with the same options
+    # as init_redis_timeseries
     await redis_timeseries.add(
         key=stock['ticker'],
         value=stock['price'],
-        timestamp=stock['timestamp']
+        timestamp=stock['timestamp'],
+        retention_msecs=RETENTION_PERIOD_SEC,
+        duplicate_policy=DUPLICATE_POLICY,
+        labels=ticker_labels(stock['ticker'])
     )
 
 
-async def fill_redis_timeseries():
-    channel = settings.pubsub_channel
-    host = settings.redis_pubsub_host
-    port = settings.redis_pubsub_port
-    redis_pubsub = Redis(
-        host=host,
-        port=port,
-    ).pubsub(ignore_subscribe_messages=True)
+async def madd_stocks(redis_timeseries: TimeSeries, stocks: list[dict]) -> list:
+    """Stocks whose samples were rejected, with their errors"""
+    replies = await redis_timeseries.madd([
+        (stock['ticker'], stock['timestamp'], stock['price'])
+        for stock in stocks
+    ])
+    return [
+        (stock, reply)
+        for stock, reply in zip(stocks, replies)
+        if isinstance(reply, ResponseError)
+    ]
 
+
+async def madd_to_redis_ts(redis_timeseries: TimeSeries, stocks: list[dict]):
+    # unlike TS.ADD, TS.MADD does not create missing series and its
+    # per sample errors are returned in the reply instead of raised
+    rejected = await madd_stocks(redis_timeseries, stocks)
+    missing = [
+        stock for stock, error in rejected
+        if KEY_MISSING_ERROR in str(error)
+    ]
+    if missing:
+        tickers = {stock['ticker'] for stock in missing}
+        LOG.info('RedisTimeseries create %d new tickers', len(tickers))
+        for ticker in tickers:
+            try:
+                await create_ticker_ts(redis_timeseries, ticker)
+            except ResponseError as e:
+                if 'key already exists' not in str(e):
+                    raise e
+        rejected = [
+            (stock, error) for stock, error in rejected
+            if KEY_MISSING_ERROR not in str(error)
+        ]
+        rejected += await madd_stocks(redis_timeseries, missing)
+    if rejected:
+        stock, error = rejected[0]
+        LOG.error(
+            'RedisTimeseries rejected %d samples, %s: %s',
+            len(rejected), stock['ticker'], error
+        )
+
+
+async def mrange_stocks(
+    redis_timeseries: TimeSeries,
+    after_ms: int,
+    before_ms: int,
+    tickers: set[str] = None
+) -> list[dict]:
+    """Stocks strictly between the timestamps, with a single TS.MRANGE
+    over the channel tickers, only of `tickers` if given"""
+    if before_ms - after_ms < 2:
+        return []
+    series = await redis_timeseries.mrange(
+        after_ms + 1,
+        before_ms - 1,
+        [f'{CHANNEL_LABEL}={settings.pubsub_channel}']
+    )
+    return [
+        {
+            'ticker': ticker,
+            'price': int(price),
+            'timestamp': timestamp
+        }
+        for s in series
+        for ticker, (_, samples) in s.items()
+        if tickers is None or ticker in tickers
+        for timestamp, price in samples
+    ]
+
+
+async def fill_redis_timeseries():
     host = settings.redis_timeseries_host
     port = settings.redis_timeseries_port
     redis_timeseries = TimeSeries(Redis(
@@ -57,8 +145,16 @@ async def fill_redis_timeseries():
     tickers = settings.tickers
     LOG.info('Initiating ReidsTimeseries')
     await init_redis_timeseries(redis_timeseries, tickers)
-    subscriber = RedisSubscriber(channel, redis_pubsub)
+    subscriber = create_subscriber(STREAM_GROUP)
     LOG.info('RedisTimeseries filler start to receiving messages')
-    async for message in subscriber.receive():
-        stock = orjson.loads(message)
-        await add_to_redis_ts(redis_timeseries, stock)
+    batches = subscriber.receive_batch(
+        settings.batch_max_items,
+        settings.batch_max_wait_sec
+    )
+    checker = create_sequence_checker()
+    async for batch in batches:
+        stocks, _ = checker.decode_batch(batch)
+        if len(stocks) == 1:
+            await add_to_redis_ts(redis_timeseries, stocks[0])
+        elif stocks:
+            await madd_to_redis_ts(redis_timeseries, stocks)
@@ -3,14 +3,16 @@ import logging
 from time import time
 from datetime import datetime
 
-import orjson
 import asyncpg
 from asyncpg.connection import Connection
 from redis.asyncio import Redis
 
 from settings import settings
-from libs.pubsub.subscribers import RedisSubscriber
+from subscription import create_sequence_checker, create_subscriber
+from fill_redis_timeseries import mrange_stocks
+from libs.redis_async_timeseries import TimeSeries
 
+STREAM_GROUP = 'timescaledb'
 LOG = logging.getLogger(settings.log_name)
 
 
@@ -55,7 +57,7 @@ async def init_timescaledb_timeseries(db_conn: Connection, tickers: list[str]):
     if not absent:
         return
     async with db_conn.transaction():
-        ts = datetime.fromtimestamp(int(time()))
+        ts = datetime.fromtimestamp(time())
         q = f"""
         INSERT INTO "{prices_table}" (ticker, price, ts)
         VALUES ($1, 0, $2);
@@ -83,19 +85,28 @@ async def add_to_quest_db_ts(db_conn: Connection, stock: dict):
             query, 
             stock['ticker'], 
             stock['price'], 
-            datetime.fromtimestamp(stock['timestamp'])
+            datetime.fromtimestamp(stock['timestamp'] / 1000)
         )
 
 
-async def fill_timescaledb_timeseries():
-    channel = settings.pubsub_channel
-    host = settings.redis_pubsub_host
-    port = settings.redis_pubsub_port
-    redis_pubsub = Redis(
-        host=host,
-        port=port,
-    ).pubsub(ignore_subscribe_messages=True)
+async def add_many_to_quest_db_ts(db_conn: Connection, stocks: list[dict]):
+    query = f"""
+    INSERT INTO prices (ticker, price, ts)
+    VALUES ($1, $2, $3)
+    """
+    rows = [
+        (
+            stock['ticker'],
+            stock['price'],
+            datetime.fromtimestamp(stock['timestamp'] / 1000)
+        )
+        for stock in stocks
+    ]
+    async with db_conn.transaction():
+        await db_conn.executemany(query, rows)
+
 
+async def fill_timescaledb_timeseries():
     host = settings.timescaledb_timeseries_host
     port = settings.timescaledb_timeseries_port
     user = settings.timescaledb_timeseries_user
@@ -112,8 +123,39 @@ async def fill_timescaledb_timeseries():
     tickers = settings.tickers
     LOG.info('Initiating timescaledbTimeseries')
     await init_timescaledb_timeseries(timescaledb_con, tickers)
-    subscriber = RedisSubscriber(channel, redis_pubsub)
+    subscriber = create_subscriber(STREAM_GROUP)
     LOG.info('timescaledb filler start to receiving messages')
-    async for message in subscriber.receive():
-        stock = orjson.loads(message)
-        await add_to_quest_db_ts(timescaledb_con, stock)
+    batches = subscriber.receive_batch(
+        settings.batch_max_items,
+        settings.batch_max_wait_sec
+    )
+    redis_timeseries = None
+    if settings.gap_backfill:
+        redis_timeseries = TimeSeries(Redis(
+            host=settings.redis_timeseries_host,
+            port=settings.redis_timeseries_port,
+        ))
+    checker = create_sequence_checker()
+    async for batch in batches:
+        stocks, lost = checker.decode_batch(batch)
+        if redis_timeseries is not None:
+            retention_ms = settings.redis_timeseries_retention_period_sec * 1000
+            for after_ms, before_ms, tickers in lost:
+                if after_ms < time() * 1000 - retention_ms:
+                    LOG.warning(
+                        'Lost stocks are older than RedisTimeseries retention, '
+                        'backfill is partial'
+                    )
+                # other publishers' stocks of the window were received
+                backfill = await mrange_stocks(
+                    redis_timeseries,
+                    after_ms,
+                    before_ms,
+                    tickers
+                )
+                LOG.info(f'{len(backfill)} lost stocks backfilled from RedisTimeseries')
+                stocks.extend(backfill)
+        if len(stocks) == 1:
+            await add_to_quest_db_ts(timescaledb_con, stocks[0])
+        elif stocks:
+            await add_many_to_quest_db_ts(timescaledb_con, stocks)
@@ -1,9 +1,10 @@
 import sys
 import logging
+from socket import gethostname
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
-from pydantic import BaseSettings
+from pydantic import BaseSettings, validator
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_DIR = SCRIPT_DIR.parent
@@ -19,12 +20,35 @@ def gen_tickers(cnt: int) -> list[int]:
 class FillersSetttings(BaseSettings):
     redis_timeseries_host = 'redis_timeseries'
     redis_timeseries_port= 6379
+    # series keep this much history behind their newest sample,
+    # gap_backfill can only recover stocks lost within it
     redis_timeseries_retention_period_sec = 60
 
     redis_pubsub_host = 'redis_pubsub'
     redis_pubsub_port = 6380
 
     pubsub_channel = 'stocks'
+    # messages already buffered on the subscription are written
+    # together, up to batch_max_items per write
+    batch_max_items: int = 1000
+    batch_max_wait_sec: float = 0.0
+    # >0 drains the subscription into a queue of that many messages,
+    # so a stalled storage write does not leave them buffered in redis;
+    # block (lossless) or drop_oldest once the queue is full
+    subscriber_queue_size: int = 0
+    subscriber_queue_policy: str = 'block'
+    # queue stats are logged this often, drops as soon as they happen
+    subscriber_queue_stats_interval_sec: float = 60
+    # read the scrapper pubsub_stream with consumer groups instead of
+    # subscribing to the channel, empty disables. Fillers of the same
+    # kind split the stream, consumer_name must be stable across restarts
+    # to resume from unacknowledged messages
+    pubsub_stream: str = ''
+    consumer_name: str = gethostname()
+    # timescaledb filler reloads stocks lost between sequence gaps
+    # from RedisTimeseries; only stocks of ticks missed completely
+    # are recovered, the ticks around a gap may stay incomplete
+    gap_backfill: bool = False
 
     timescaledb_timeseries_host:str = 'timescaledb_timeseries'
     timescaledb_timeseries_port:int = 5432
@@ -39,6 +63,17 @@ class FillersSetttings(BaseSettings):
     log_name:str = 'db_fillers'
     log_level:str = 'INFO'
 
+    @validator('subscriber_queue_policy')
+    def check_subscriber_queue_policy(cls, policy):
+        # fillers store every message, conflate would drop prices
+        # and has no per-message key for tick frames anyway
+        if policy not in ('block', 'drop_oldest'):
+            raise ValueError(
+                f'Unsupported subscriber queue policy {policy}, '
+                'available: block, drop_oldest'
+            )
+        return policy
+
     class Config:
         env_prefix = "fillers_"
         env_file = ".env"
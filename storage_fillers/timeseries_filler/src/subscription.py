@@ -0,0 +1,120 @@
+import logging
+from asyncio import Task, create_task, sleep
+from time import monotonic
+
+from redis.asyncio import Redis
+
+from settings import settings
+from libs.pubsub.consumer_queue import ConsumerQueue
+from libs.pubsub.frames import decode_stocks
+from libs.pubsub.sequence import GapDetector, split_sequence
+from libs.pubsub.subscribers import ISubscriber, RedisSubscriber, StreamSubscriber
+
+LOG = logging.getLogger(settings.log_name)
+# how often queues are checked for dropped messages
+QUEUE_CHECK_SEC = 1.0
+# running queue watchers, referenced so they are not collected
+QUEUE_WATCHERS: set[Task] = set()
+
+
+def create_subscriber(group: str) -> ISubscriber:
+    """Subscribes to the pubsub channel, or with `pubsub_stream` reads
+    the stream as a `consumer_name` consumer of `group`, so fillers of
+    the same group split the stream between them"""
+    redis = Redis(
+        host=settings.redis_pubsub_host,
+        port=settings.redis_pubsub_port,
+    )
+    stream = settings.pubsub_stream
+    if not stream:
+        queue = None
+        if settings.subscriber_queue_size:
+            queue = ConsumerQueue(
+                settings.subscriber_queue_size,
+                settings.subscriber_queue_policy
+            )
+            watcher = create_task(watch_queue(group, queue))
+            QUEUE_WATCHERS.add(watcher)
+            watcher.add_done_callback(QUEUE_WATCHERS.discard)
+        return RedisSubscriber(
+            settings.pubsub_channel,
+            redis.pubsub(ignore_subscribe_messages=True),
+            queue=queue
+        )
+    consumer = settings.consumer_name
+    LOG.info(f'Reading "{stream}" stream as {group}/{consumer}')
+    return StreamSubscriber(stream, redis, group, consumer)
+
+
+async def watch_queue(name: str, queue: ConsumerQueue):
+    """Logs the queue stats every `subscriber_queue_stats_interval_sec`,
+    and a warning as soon as messages were dropped"""
+    interval = settings.subscriber_queue_stats_interval_sec
+    dropped = 0
+    logged = monotonic()
+    while True:
+        await sleep(QUEUE_CHECK_SEC)
+        stats = queue.stats()
+        if stats['dropped'] > dropped:
+            LOG.warning(
+                f'{name} subscriber queue dropped '
+                f'{stats["dropped"] - dropped} messages, {stats}'
+            )
+            dropped = stats['dropped']
+        elif monotonic() - logged >= interval:
+            LOG.info(f'{name} subscriber queue {stats}')
+        else:
+            continue
+        logged = monotonic()
+
+
+class SequenceChecker:
+    """Decodes batches of channel messages counting sequence gaps
+    (only messages stamped by the scrapper `pubsub_sequence` have them)"""
+
+    def __init__(self, channel: str, detect_gaps: bool = True) -> None:
+        self.channel = channel
+        self.detect_gaps = detect_gaps
+        self.gaps = GapDetector()
+        # publisher id -> timestamp of its last decoded message
+        self.last_timestamps: dict[int, int] = {}
+        # publisher id -> tickers it published, publishers (scrapper
+        # workers) of the channel publish disjoint sets of tickers
+        self.publisher_tickers: dict[int, set[str]] = {}
+
+    def decode_batch(
+        self,
+        batch: list[bytes]
+    ) -> tuple[list[dict], list[tuple[int, int, set[str]]]]:
+        """Returns decoded stocks and the (after_ms, before_ms, tickers)
+        of each gap, lost stocks are strictly between the timestamps
+        and of the tickers of the publisher that lost them"""
+        stocks = []
+        lost = []
+        for data in batch:
+            gap = None
+            publisher, seq, payload = split_sequence(data)
+            if self.detect_gaps and seq is not None:
+                gap = self.gaps.observe(self.channel, publisher, seq)
+            decoded = decode_stocks(payload)
+            if not decoded:
+                continue
+            last_timestamp = self.last_timestamps.get(publisher)
+            tickers = self.publisher_tickers.setdefault(publisher, set())
+            tickers.update(s['ticker'] for s in decoded)
+            if gap is not None:
+                LOG.warning(
+                    f'{gap.last - gap.first + 1} messages lost on {gap.channel} '
+                    f'from publisher {gap.publisher}, {self.gaps.stats()}'
+                )
+                if last_timestamp is not None:
+                    lost.append((last_timestamp, decoded[0]['timestamp'], tickers))
+            stocks.extend(decoded)
+            self.last_timestamps[publisher] = decoded[-1]['timestamp']
+        return stocks, lost
+
+
+def create_sequence_checker() -> SequenceChecker:
+    # stream consumers of a group get a share of the messages each,
+    # their sequences have gaps by design
+    return SequenceChecker(settings.pubsub_channel, not settings.pubsub_stream)